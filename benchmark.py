@@ -0,0 +1,223 @@
+"""
+Benchmarks the simulation's hot paths on seeded worlds of several population
+sizes and writes the results as JSON, so runs can be compared across commits.
+
+    python benchmark.py --out bench.json
+    python benchmark.py --sizes 100 500 --compare bench.json
+
+For each size it times the phases of a tick (environment, spatial index, creature
+update, interactions), the full `Simulation.step` rate, and offscreen drawing of the
+terrain and creatures. `generate_world` and one NEAT evolution step are timed once,
+and the memory taken by each creature and food item is measured once.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+import platform
+import subprocess
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import neat
+import pygame
+
+import core.simulation
+from settings import SCREEN_WIDTH, SCREEN_HEIGHT, NUMBER_OF_TRIBES_PER_SPECIES, TRIBE_COLORS
+from entities.archetypes import CREATURE_ARCHETYPES
+from entities.creature import Creature
+from entities.food import Food
+from core.simulation import Simulation
+from core.world_management import generate_world
+from core.profiling import PROFILER
+from rendering.drawing import draw_world, draw_vegetation, draw_creature
+
+DEFAULT_SIZES = [100, 500, 2000, 10000]
+
+
+def build_simulation(config, creature_count, seed):
+    """A seeded Simulation whose population is replaced by `creature_count` creatures of every archetype."""
+    sim = Simulation(config, seed=seed)
+    reporters = sim.neat_population.reporters.reporters
+    reporters[:] = [r for r in reporters if not isinstance(r, neat.StdOutReporter)]
+    genomes = list(sim.neat_population.population.values())
+    archetypes = list(CREATURE_ARCHETYPES.values())
+    sim.creatures = []
+    for i in range(creature_count):
+        tribe_id = i % NUMBER_OF_TRIBES_PER_SPECIES
+        sim.creatures.append(Creature(sim, genomes[i % len(genomes)], archetypes[i % len(archetypes)],
+                                      tribe_id, TRIBE_COLORS[tribe_id]))
+    sim.recount()
+    return sim
+
+
+# Phases reported by the benchmark and the Simulation.step profiler phase each one reads
+PHASES = {'environment': 'simulation.environment', 'spatial': 'simulation.spatial',
+          'update': 'simulation.creatures', 'interactions': 'simulation.interactions'}
+
+
+def time_phases(sim, ticks):
+    """
+    Runs `ticks` ticks of `Simulation.step` with the profiler on and returns the mean ms
+    of each of its phases, so the benchmark times exactly what a real tick does.
+    """
+    totals = dict.fromkeys(PHASES, 0.0)
+    enabled, PROFILER.enabled = PROFILER.enabled, True
+    PROFILER.reset()
+    try:
+        for _ in range(ticks):
+            sim.step()
+            for name, phase in PHASES.items(): totals[name] += PROFILER.current.get(phase, 0.0)
+            PROFILER.reset()
+    finally:
+        PROFILER.enabled = enabled
+    return {name: total / ticks * 1000 for name, total in totals.items()}
+
+
+def time_steps(sim, ticks):
+    """Ticks per second of the full `Simulation.step`."""
+    start = time.perf_counter()
+    for _ in range(ticks):
+        sim.step()
+    return ticks / (time.perf_counter() - start)
+
+
+def time_drawing(sim, frames):
+    """
+    Mean ms per offscreen frame of draw_world (plus the vegetation overlay, if any) and of
+    draw_creature over all creatures (after one warm-up frame).
+    """
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    terrain = sim.assets['terrain']
+    draw_world(screen, sim.world, terrain)
+    if sim.vegetation is not None: draw_vegetation(screen, sim.vegetation)
+    for c in sim.creatures: draw_creature(screen, c, False)
+    world_time = creature_time = 0.0
+    for _ in range(frames):
+        start = time.perf_counter()
+        draw_world(screen, sim.world, terrain)
+        if sim.vegetation is not None: draw_vegetation(screen, sim.vegetation)
+        middle = time.perf_counter()
+        for c in sim.creatures: draw_creature(screen, c, False)
+        world_time += middle - start
+        creature_time += time.perf_counter() - middle
+    return {'draw_world': world_time / frames * 1000, 'draw_creatures': creature_time / frames * 1000}
+
+
+def time_generate_world(seed, repeats=3):
+    """Mean ms of generating the default-sized world from scratch (bypassing the terrain cache)."""
+    start = time.perf_counter()
+    for i in range(repeats):
+        generate_world(seed + i, use_cache=False)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def time_evolution(config, seed):
+    """ms of one NEAT generation (`p.run`) plus redistributing the new brains, on a seeded world."""
+    sim = build_simulation(config, config.pop_size, seed)
+    for i, c in enumerate(sim.creatures): c.genome.fitness = random.Random(seed + i).randint(0, 1000)
+    start = time.perf_counter()
+    sim.evolve()
+    return (time.perf_counter() - start) * 1000
+
+
+def entity_bytes(config, seed, count=2000):
+    """Bytes allocated per creature and per food item (shared genomes, brains and assets excluded)."""
+    sim = build_simulation(config, 0, seed)
+    genomes = list(sim.neat_population.population.values())
+    archetypes = list(CREATURE_ARCHETYPES.values())
+    makers = {
+        'creature': lambda i: Creature(sim, genomes[i % len(genomes)], archetypes[i % len(archetypes)],
+                                       i % NUMBER_OF_TRIBES_PER_SPECIES, TRIBE_COLORS[i % NUMBER_OF_TRIBES_PER_SPECIES]),
+        'food': lambda i: Food(sim, (i % SCREEN_WIDTH, i % SCREEN_HEIGHT)),
+    }
+    sizes = {}
+    for name, make in makers.items():
+        make(0)  # Warm the brain cache
+        tracemalloc.start()
+        entities = [make(i) for i in range(count)]
+        allocated = tracemalloc.get_traced_memory()[0] - sys.getsizeof(entities)
+        tracemalloc.stop()
+        sizes[name] = allocated / count
+    return sizes
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(config_file, sizes=DEFAULT_SIZES, ticks=10, frames=5, seed=1):
+    """Runs every benchmark and returns the results as a JSON-serializable dict."""
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation, config_file)
+    pygame.font.init()
+    results = {
+        'meta': {
+            'commit': git_commit(), 'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'python': platform.python_version(),
+            'platform': platform.platform(), 'seed': seed, 'ticks': ticks, 'frames': frames,
+            'vegetation_grid': core.simulation.VEGETATION_GRID,
+        },
+        'generate_world_ms': time_generate_world(seed),
+        'evolution_ms': time_evolution(config, seed),
+        'entity_bytes': entity_bytes(config, seed),
+        'sizes': {},
+    }
+    for size in sizes:
+        # Large populations get fewer ticks (never fewer than 2) so the suite stays usable
+        size_ticks = max(2, min(ticks, ticks * 500 // size))
+        # Phases and full steps each start from the same seeded world
+        phases = time_phases(build_simulation(config, size, seed), size_ticks)
+        ticks_per_sec = time_steps(build_simulation(config, size, seed), size_ticks)
+        phases.update(time_drawing(build_simulation(config, size, seed), frames))
+        results['sizes'][str(size)] = {'ticks': size_ticks, 'ticks_per_sec': ticks_per_sec, 'phases_ms': phases}
+        print(f"{size:>6} creatures: {ticks_per_sec:8.2f} ticks/sec | "
+              + " | ".join(f"{phase} {ms:.2f}ms" for phase, ms in phases.items()))
+    print(f"generate_world: {results['generate_world_ms']:.1f}ms | evolution step: {results['evolution_ms']:.1f}ms")
+    print(" | ".join(f"{name}: {size:.0f} bytes" for name, size in results['entity_bytes'].items()))
+    return results
+
+
+def compare(results, baseline):
+    """Prints each metric next to the baseline's, as a ratio (>1 means faster, or smaller, than the baseline)."""
+    print(f"--- Compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('time')}) ---")
+    for key in ('generate_world_ms', 'evolution_ms'):
+        if key in baseline: print(f"{key}: {baseline[key] / results[key]:.2f}x")
+    for name, size in baseline.get('entity_bytes', {}).items():
+        print(f"{name} bytes: {size / results['entity_bytes'][name]:.2f}x")
+    for size, current in results['sizes'].items():
+        old = baseline['sizes'].get(size)
+        if not old: continue
+        speedups = [f"ticks/sec {current['ticks_per_sec'] / old['ticks_per_sec']:.2f}x"]
+        speedups += [f"{phase} {old['phases_ms'][phase] / ms:.2f}x" for phase, ms in current['phases_ms'].items()
+                     if old['phases_ms'].get(phase) and ms > 0]
+        print(f"{size:>6} creatures: " + " | ".join(speedups))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks of the ecosystem's hot paths")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="creature counts to benchmark")
+    parser.add_argument("--ticks", type=int, default=10, help="ticks timed per size (scaled down above 500 creatures)")
+    parser.add_argument("--frames", type=int, default=5, help="frames drawn per size")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--vegetation", action="store_true", help="benchmark with plants as a vegetation grid")
+    parser.add_argument("--out", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), 'config-feedforward.txt'))
+    args = parser.parse_args()
+
+    if args.vegetation: core.simulation.VEGETATION_GRID = True
+    results = run_benchmarks(args.config, args.sizes, args.ticks, args.frames, args.seed)
+    if args.out:
+        with open(args.out, 'w') as f: json.dump(results, f, indent=2)
+        print(f"--- Results written to {args.out} ---")
+    if args.compare:
+        with open(args.compare) as f: compare(results, json.load(f))
+    sys.exit(0)
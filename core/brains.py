@@ -0,0 +1,145 @@
+import weakref
+from collections import OrderedDict
+import neat
+import numpy as np
+from neat import activations, aggregations
+from settings import NETWORK_CACHE_SIZE
+
+# NumPy counterparts of neat's activation functions, including their input clamping
+ACTIVATIONS = {
+    activations.tanh_activation: lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    activations.sigmoid_activation: lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    activations.relu_activation: lambda z: np.where(z > 0.0, z, 0.0),
+    activations.identity_activation: lambda z: z,
+    activations.clamped_activation: lambda z: np.clip(z, -1.0, 1.0),
+}
+
+
+class CompiledNetwork:
+    """
+    A FeedForwardNetwork's node evaluations regrouped into layers (each node one past
+    the deepest of its inputs), with one weight matrix per layer, so that many input
+    vectors go through it at once. Outputs match `activate` up to floating-point
+    summation order. Only `sum` aggregation and the activations in ACTIVATIONS
+    compile; `supported` is False for any other network.
+    """
+
+    def __init__(self, net):
+        self.supported = all(aggregation is aggregations.sum_aggregation and activation in ACTIVATIONS
+                             for _, activation, aggregation, _, _, _ in net.node_evals)
+        if not self.supported: return
+        # Column of every value in the activation matrix: inputs, outputs, then hidden nodes
+        self.columns = {key: i for i, key in enumerate(net.input_nodes + net.output_nodes)}
+        self.output_columns = [self.columns[key] for key in net.output_nodes]
+        depth = dict.fromkeys(net.input_nodes, 0)
+        layers = []
+        for node, activation, _, bias, response, links in net.node_evals:
+            depth[node] = 1 + max((depth[i] for i, _ in links), default=0)
+            self.columns.setdefault(node, len(self.columns))
+            if depth[node] > len(layers): layers.append([])
+            layers[depth[node] - 1].append((node, activation, bias, response, links))
+
+        self.layers = []
+        for layer in layers:
+            weights = np.zeros((len(self.columns), len(layer)))
+            groups = {}
+            for j, (_, activation, _, _, links) in enumerate(layer):
+                for i, weight in links: weights[self.columns[i], j] += weight
+                groups.setdefault(activation, []).append(j)
+            self.layers.append((
+                [self.columns[node] for node, *_ in layer], weights,
+                np.array([bias for _, _, bias, _, _ in layer]), np.array([response for _, _, _, response, _ in layer]),
+                [(ACTIVATIONS[activation], np.array(idx)) for activation, idx in groups.items()],
+            ))
+
+    def activate_batch(self, inputs):
+        """Evaluates an (n, num_inputs) array and returns the (n, num_outputs) outputs."""
+        values = np.zeros((len(inputs), len(self.columns)))
+        values[:, :inputs.shape[1]] = inputs
+        for node_columns, weights, bias, response, layer_activations in self.layers:
+            pre = bias + response * (values @ weights)
+            for activation, idx in layer_activations:
+                pre[:, idx] = activation(pre[:, idx])
+            values[:, node_columns] = pre
+        return values[:, self.output_columns]
+
+
+def genome_version(genome):
+    """Fingerprint of everything in a genome that affects its network."""
+    nodes = tuple(sorted((k, n.bias, n.response, n.activation, n.aggregation) for k, n in genome.nodes.items()))
+    connections = tuple(sorted((k, c.weight, c.enabled) for k, c in genome.connections.items()))
+    return hash((nodes, connections))
+
+
+class NetworkCache:
+    """
+    LRU cache of built networks keyed by (genome key, structural version), so
+    creatures sharing a genome share one `FeedForwardNetwork` instead of building
+    their own.
+    """
+
+    def __init__(self, max_size=NETWORK_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = weakref.WeakKeyDictionary()
+
+    def get(self, genome, config):
+        """Returns the (shared) FeedForwardNetwork for a genome."""
+        version = self._versions.get(genome)
+        if version is None:
+            version = self._versions[genome] = genome_version(genome)
+        key = (genome.key, version)
+        net = self._entries.get(key)
+        if net is None:
+            net = self._entries[key] = neat.nn.FeedForwardNetwork.create(genome, config)
+            if len(self._entries) > self.max_size: self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return net
+
+    def retain(self, population):
+        """Keeps only the networks of genomes in `population` (called after NEAT builds a new generation)."""
+        keys = set(population)
+        for key in [key for key in self._entries if key[0] not in keys]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._versions.clear()
+
+
+NETWORK_CACHE = NetworkCache()
+
+
+class BatchedBrainEvaluator:
+    """
+    Evaluates the brains of many creatures in one pass: creatures are grouped by
+    network (those sharing a genome share one) and each group's input vectors go
+    through its compiled network as one matrix product per layer. A creature alone
+    with its network, or one the compiler does not support, uses its own `net.activate`.
+    """
+
+    def __init__(self):
+        self._compiled = weakref.WeakKeyDictionary()
+
+    def compiled(self, net):
+        network = self._compiled.get(net)
+        if network is None: network = self._compiled[net] = CompiledNetwork(net)
+        return network
+
+    def evaluate(self, creatures, inputs):
+        """Returns an (n, num_outputs) array with the brain outputs for each creature and row of `inputs`."""
+        groups = {}
+        for i, creature in enumerate(creatures):
+            groups.setdefault(creature.net, []).append(i)
+        outputs = np.zeros((len(creatures), len(creatures[0].net.output_nodes))) if creatures else np.zeros((0, 0))
+        for net, indices in groups.items():
+            network = self.compiled(net) if len(indices) > 1 else None
+            if network is not None and network.supported:
+                outputs[indices] = network.activate_batch(inputs[indices])
+            else:
+                for i in indices: outputs[i] = net.activate(inputs[i].tolist())
+        return outputs
+
+
+BRAINS = BatchedBrainEvaluator()
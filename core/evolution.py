@@ -0,0 +1,90 @@
+"""
+Runs NEAT generations off the simulation loop. A generation only needs the
+population and one fitness value per genome key, so it can be computed in a worker
+process while the simulation keeps ticking with the current brains; the evolved
+population is swapped in as a whole once it is ready.
+
+Every generation is seeded from the simulation's `random` when it starts, so its
+result does not depend on where (or when) it was computed. A run is still only
+reproducible if the swap happens at the same tick, which is why replays swap at
+the recorded ticks and headless runs wait for the result on the spot.
+"""
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from settings import BACKGROUND_EVOLUTION
+
+
+def run_generation(population, seed, fitness):
+    """
+    Runs one generation of `population` (a neat.Population) where the genome with
+    key k has fitness `fitness[k]`, with `random` seeded by `seed`, and returns it.
+    The caller's `random` state is left as it was.
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        population.run(lambda genomes, cfg: [setattr(g, 'fitness', fitness[g_id]) for g_id, g in genomes], 1)
+    finally:
+        random.setstate(state)
+    return population
+
+
+class EvolutionRunner:
+    """
+    Holds at most one pending generation. `job` describes it (start tick, seed, best
+    fitness and the fitness of every genome) and is what snapshots store, so a loaded
+    run can restart it. With `background`, the generation runs in a worker process
+    on a copy of the population; otherwise it runs when collected. Either way the
+    population is not touched until `collect()`.
+
+    `swap_ticks`, when set (replays), makes `ready()` answer from the recorded swap
+    ticks instead of from the worker, waiting for the result if needed.
+    """
+
+    def __init__(self, background=BACKGROUND_EVOLUTION):
+        self.background = background
+        self.swap_ticks = None
+        self.job = None
+        self._population = None
+        self._future = None
+        self._executor = None
+
+    @property
+    def pending(self):
+        return self.job is not None
+
+    def start(self, population, job):
+        self.job = job
+        if self.background:
+            if self._executor is None:
+                # Spawned, not forked: the parent may hold a window and the snapshot writer thread
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+            self._future = self._executor.submit(run_generation, population, job['seed'], job['fitness'])
+        else:
+            self._population = population
+
+    def ready(self, tick):
+        if self.swap_ticks is not None: return tick in self.swap_ticks
+        return self._future is None or self._future.done()
+
+    def collect(self):
+        """The evolved population (waiting for the worker if it is still running); clears the job."""
+        if self._future is not None:
+            population = self._future.result()
+        else:
+            population = run_generation(self._population, self.job['seed'], self.job['fitness'])
+        self.job = self._population = self._future = None
+        return population
+
+    def cancel(self):
+        """Forgets the pending generation (a worker already running it finishes, and is ignored)."""
+        if self._future is not None: self._future.cancel()
+        self.job = self._population = self._future = None
+
+    def close(self):
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
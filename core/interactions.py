@@ -0,0 +1,63 @@
+from settings import CELL_SIZE
+from entities.archetypes import CREATURE_ARCHETYPES
+
+# What a predator's prey_archetypes entries are matched against when it catches prey
+ARCHETYPE_NAMES = {archetype['name'] for archetype in CREATURE_ARCHETYPES.values()}
+
+
+def resolve_interactions(creatures, foods, spatial, events=None, counts=None, sleep=None, vegetation=None):
+    """
+    Resolves deaths, eating, hunting and mating for one tick.
+    Creatures act in list order, each eating the first food/prey (in list order)
+    within CELL_SIZE that has not already been taken this tick. Removals are only
+    marked while resolving and both lists are compacted once at the end; creatures
+    already killed this tick are skipped.
+    If `events` is a list, deaths, kills and births are appended to it; if `counts`
+    is a {name: count} dict, it is kept up to date with the deaths and births.
+    Creatures parked by a `sleep` schedule can neither die, graze nor mate before
+    they are woken up (see core/sleep.py), so only those able to catch prey are checked.
+    With a `vegetation` grid, grazers that are awake take a bite out of the cell they
+    stand on instead of eating food items.
+    """
+    dead, eaten = set(), set()
+    died, new_creatures = [], []
+
+    for creature in creatures:
+        # Prey killed earlier this tick neither act nor die a second time
+        if id(creature) in dead: continue
+        if creature.asleep_since is not None and (not creature.diet['meat'] or ARCHETYPE_NAMES.isdisjoint(creature.prey_archetypes)):
+            continue
+        if creature.is_dead():
+            dead.add(id(creature)); died.append(creature)
+            if events is not None: events.append({'type': 'death', 'uid': creature.uid, 'name': creature.name,
+                                                  'cause': 'starvation' if creature.energy <= 0 else 'old_age'})
+            continue
+        if creature.diet['plants'] and vegetation is not None:
+            # Sleepers do not graze, so parking them changes nothing
+            eaten_biomass = vegetation.graze(creature.x, creature.y) if creature.state != 'sleeping' else 0.0
+            if eaten_biomass:
+                creature.energy = min(creature.max_energy, creature.energy + creature.energy_per_food * eaten_biomass); creature.genome.fitness += 5
+        elif creature.diet['plants']:
+            for food in spatial.foods.query(creature.x, creature.y, CELL_SIZE):
+                if id(food) not in eaten:
+                    creature.energy = min(creature.max_energy, creature.energy + creature.energy_per_food); eaten.add(id(food)); creature.genome.fitness += 5; break
+        if creature.diet['meat']:
+            for prey in spatial.creatures.query(creature.x, creature.y, CELL_SIZE):
+                if prey is not creature and id(prey) not in dead and prey.name in creature.prey_archetypes:
+                    if sleep: sleep.wake(creature)
+                    creature.energy = min(creature.max_energy, creature.energy + creature.energy_per_food); dead.add(id(prey)); died.append(prey); creature.genome.fitness += 25
+                    if events is not None: events.append({'type': 'kill', 'uid': creature.uid, 'prey': prey.uid, 'x': prey.x, 'y': prey.y})
+                    break
+        if creature.reproduction_urge > 1.0:
+            for partner in spatial.creatures.query(creature.x, creature.y, CELL_SIZE):
+                if partner is not creature and id(partner) not in dead and creature.name == partner.name and partner.reproduction_urge > 1.0:
+                    new_creatures.append(creature.reproduce(partner)); creature.genome.fitness += 20; partner.genome.fitness += 20
+                    if events is not None: events.append({'type': 'birth', 'uid': new_creatures[-1].uid, 'parents': [creature.uid, partner.uid]})
+                    break
+
+    if dead: creatures[:] = [c for c in creatures if id(c) not in dead]
+    if eaten: foods[:] = [f for f in foods if id(f) not in eaten]
+    creatures.extend(new_creatures)
+    if counts is not None:
+        for c in died: counts[c.name] -= 1
+        for c in new_creatures: counts[c.name] += 1
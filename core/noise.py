@@ -0,0 +1,47 @@
+import math
+import random
+import numpy as np
+
+
+def _fade(values):
+    # Only evaluated on 1-D coordinate arrays, with math.pow to stay bit-identical to perlin_noise
+    return np.array([6 * math.pow(t, 5) - 15 * math.pow(t, 4) + 10 * math.pow(t, 3) for t in values.tolist()])
+
+
+def _corner_gradients(seed, xs, ys):
+    """Gradient vectors at the lattice corners (xs x ys), seeded exactly like perlin_noise.RandVec."""
+    gradients = np.empty((len(xs), len(ys), 2))
+    for i, cx in enumerate(xs):
+        for j, cy in enumerate(ys):
+            corner_seed = seed * max(1, int(abs(cx + 10 * cy + 1)))
+            rng = random.Random(corner_seed)
+            gradients[i, j] = rng.uniform(-1, 1), rng.uniform(-1, 1)
+    return gradients
+
+
+def perlin_grid(seed, width, height, scale, octaves):
+    """
+    Vectorized equivalent of `PerlinNoise(octaves, seed)([x / scale, y / scale])`
+    for every cell of a width x height grid, returned as a (width, height) array.
+    Each lattice corner's gradient is drawn once instead of once per cell, and the
+    per-cell interpolation runs as whole-array operations.
+    """
+    if not seed:
+        # perlin_noise draws a random seed when given 0/None; do the same
+        seed = random.randint(1, 10**5)
+    coord_x = (np.arange(width) / scale) * octaves
+    coord_y = (np.arange(height) / scale) * octaves
+    x0, y0 = np.floor(coord_x).astype(np.int64), np.floor(coord_y).astype(np.int64)
+    corners_x = np.arange(x0.min(), x0.max() + 2)
+    corners_y = np.arange(y0.min(), y0.max() + 2)
+    gradients = _corner_gradients(seed, corners_x.tolist(), corners_y.tolist())
+
+    total = np.zeros((width, height))
+    # Same corner order as itertools.product in perlin_noise, so the sum is bit-identical
+    for ox in (0, 1):
+        for oy in (0, 1):
+            dx, dy = coord_x - (x0 + ox), coord_y - (y0 + oy)
+            weight = _fade(1 - np.abs(dx))[:, None] * _fade(1 - np.abs(dy))[None, :]
+            gradient = gradients[(x0 + ox - corners_x[0])[:, None], (y0 + oy - corners_y[0])[None, :]]
+            total = total + weight * (gradient[..., 0] * dx[:, None] + gradient[..., 1] * dy[None, :])
+    return total
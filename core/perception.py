@@ -0,0 +1,64 @@
+import math
+from settings import PERCEPTION_REFRESH_EVERY
+
+
+class Perception:
+    """What a creature last perceived (see Creature.perceive): references to its flockmates and targets, and when."""
+    __slots__ = ('tick', 'flockmates', 'threat', 'panicked_mate', 'food', 'mate', 'rival')
+
+    def __init__(self, tick, flockmates, threat, panicked_mate, food, mate, rival):
+        self.tick = tick
+        self.flockmates, self.threat, self.panicked_mate = flockmates, threat, panicked_mate
+        self.food, self.mate, self.rival = food, mate, rival
+
+    def targets(self):
+        return self.threat, self.panicked_mate, self.food, self.mate, self.rival
+
+
+class PerceptionScheduler:
+    """
+    Staggered perception level of detail. A creature rebuilds its perception (the
+    neighbor queries and target choices) every `every` ticks, in a slot given by its
+    uid so the work is spread evenly over the ticks, and in between recomputes its
+    brain inputs from the cached references at their current positions.
+
+    It perceives again sooner when a cached target is gone (eaten, grazed bare, killed, dead) or
+    out of sight, when a creature it fears comes into sight while it had no threat,
+    and after any tick it skipped (asleep).
+    """
+
+    def __init__(self, every=PERCEPTION_REFRESH_EVERY):
+        self.every = every
+        self.tick = 0
+        self.spatial = None
+        self.vegetation = None
+
+    def start_tick(self, tick, spatial, vegetation=None):
+        self.tick, self.spatial, self.vegetation = tick, spatial, vegetation
+
+    def due(self, creature, effective_vision):
+        """Whether `creature` must perceive its surroundings afresh this tick."""
+        perception = creature.perception
+        if perception is None or self.tick - perception.tick > 1 or (self.tick + creature.uid) % self.every == 0:
+            return True
+        creatures, foods, vegetation = self.spatial.creatures, self.spatial.foods, self.vegetation
+        for target in perception.targets():
+            if target is None: continue
+            if not (target in creatures or target in foods or (vegetation is not None and target in vegetation)): return True
+            if math.hypot(creature.x - target.x, creature.y - target.y) >= effective_vision: return True
+        if perception.threat is None:
+            for name in creature.predator_archetypes:
+                named = self.spatial.by_name.get(name)
+                if named and named.query(creature.x, creature.y, effective_vision): return True
+        return False
+
+    def perceived(self, creature, flockmates, threat, panicked_mate, food, mate, rival):
+        creature.perception = Perception(self.tick, flockmates, threat, panicked_mate, food, mate, rival)
+
+    def recall(self, creature):
+        """The cached perception, keeping its tick current and dropping flockmates that are gone."""
+        perception = creature.perception
+        perception.tick = self.tick
+        creatures = self.spatial.creatures
+        perception.flockmates = [mate for mate in perception.flockmates if mate in creatures]
+        return perception
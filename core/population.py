@@ -0,0 +1,376 @@
+import math
+import random
+import numpy as np
+import pygame
+from settings import CELL_SIZE, DAY_LENGTH
+from entities.archetypes import CREATURE_ARCHETYPES, Archetype
+from core.profiling import PROFILER
+from core.brains import BRAINS
+
+STATE_CODES = {'exploring': 0, 'fleeing': 1, 'going_to_sleep': 2, 'sleeping': 3}
+STATE_NAMES = tuple(STATE_CODES)
+EXPLORING, FLEEING, GOING_TO_SLEEP, SLEEPING = (STATE_CODES[state] for state in STATE_NAMES)
+
+# One column per stored creature attribute: what changes every tick, plus the
+# per-creature constants the batched phases and the neighbor masks need
+COLUMNS = {
+    'x': np.float64, 'y': np.float64, 'angle': np.float64, 'energy': np.float64, 'age': np.int64,
+    'tiredness': np.float64, 'reproduction_urge': np.float64, 'state': np.int8,
+    'kind': np.int16, 'tribe_id': np.int16, 'nest_x': np.float64, 'nest_y': np.float64, 'night_vision_gene': bool,
+}
+
+# Most entries in a block of the distance matrices `PopulationStore.perceive` works through at once
+BLOCK_ENTRIES = 1 << 20
+
+
+def _unit(dx, dy, reach=np.inf):
+    """(dx, dy) scaled to length 1, or (0, 0) where it is zero, NaN (no target) or longer than `reach`."""
+    length = np.hypot(dx, dy)
+    seen = (length > 0) & (length <= reach)
+    length = np.where(seen, length, 1.0)
+    return np.where(seen, dx / length, 0.0), np.where(seen, dy / length, 0.0)
+
+
+def _nearest(mask, distances):
+    """Per row, the column of the smallest of `distances` where `mask` holds (the first on ties), or -1."""
+    j = np.where(mask, distances, np.inf).argmin(1)
+    return np.where(mask[np.arange(len(j)), j], j, -1)
+
+
+class Kinds:
+    """
+    Integer codes for the archetype records (see entities/archetypes.py), stored in the
+    `kind` column, and per-code tables of the base attributes the batched phases read.
+    `fears[a, b]` is whether kind `a` flees from kind `b`, `hunts[a, b]` whether it hunts it,
+    `plants` and `meat` the diets.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._codes = {}
+
+    def code(self, kind):
+        code = self._codes.get(id(kind))
+        if code is None:
+            code = self._codes[id(kind)] = len(self.records)
+            self.records.append(kind)
+            self._build_tables()
+        return code
+
+    def _build_tables(self):
+        records = self.records
+        self.max_speed = np.array([k.max_speed for k in records], dtype=np.float64)
+        self.vision_radius = np.array([k.vision_radius for k in records], dtype=np.float64)
+        self.max_energy = np.array([k.max_energy for k in records], dtype=np.float64)
+        self.urge_threshold = np.array([k.reproduction_urge_threshold for k in records], dtype=np.float64)
+        # Matched the way Creature.perceive always has: other creatures' names against the archetype lists
+        self.fears = np.array([[b.name in a.predator_archetypes for b in records] for a in records], dtype=bool)
+        self.hunts = np.array([[b.name in a.prey_archetypes for b in records] for a in records], dtype=bool)
+        self.plants = np.array([k.diet['plants'] for k in records], dtype=bool)
+        self.meat = np.array([k.diet['meat'] for k in records], dtype=bool)
+
+
+KINDS = Kinds()
+for spec in CREATURE_ARCHETYPES.values(): KINDS.code(Archetype.of(spec))
+
+
+class PopulationStore:
+    """
+    Structure-of-arrays storage of the creatures: one NumPy column per attribute
+    (position, heading, energy, age, tiredness, urge, state code, archetype, tribe,
+    nest and night vision gene). Row i belongs to `members[i]`, and `Creature` reads
+    and writes those attributes in its row, so the objects stay the facade that
+    drawing, the inspector, interactions and snapshots use, while a tick runs the
+    bookkeeping over whole columns (see `update`).
+
+    `sync` lines the rows up with the simulation's creature list once per tick.
+    Creatures that left the list move to a one-row store of their own, so anyone
+    still holding one (the inspector, a cached perception) reads its last values.
+    """
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.members = []
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+    def add(self, creature):
+        """Gives a new creature the next free row (its constructor then fills it in)."""
+        row = self.size
+        if row == len(self.columns['x']): self._grow(2 * row or 1)
+        self.size += 1
+        self.members.append(creature)
+        creature.population, creature.row = self, row
+        self.columns['kind'][row] = KINDS.code(creature.kind)
+
+    def _take(self, creature):
+        """Moves a creature of another store into the next free row, values and all."""
+        source, source_row = creature.population, creature.row
+        self.add(creature)
+        for name, column in self.columns.items(): column[creature.row] = source.columns[name][source_row]
+
+    def _grow(self, capacity):
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            self.columns[name] = grown
+
+    def sync(self, creatures):
+        """Makes row i belong to creatures[i], after deaths, births, spawns or a load changed the list."""
+        if self.members == creatures: return
+        for c in creatures:
+            if c.population is not self: self._take(c)
+        listed = {id(c) for c in creatures}
+        for c in self.members:
+            if id(c) not in listed and c.population is self: PopulationStore(1)._take(c)
+        n = len(creatures)
+        order = np.fromiter((c.row for c in creatures), dtype=np.intp, count=n)
+        for column in self.columns.values(): column[:n] = column[order]
+        for row, c in enumerate(creatures): c.row = row
+        self.members, self.size = list(creatures), n
+
+    def column(self, name):
+        """The live rows of a column (a view: writes go to the creatures)."""
+        return self.columns[name][:self.size]
+
+    def update(self, active, think, context):
+        """
+        One tick of the `active` creatures (in list order, all synced into this store):
+        aging, energy decay, tiredness, urge, night vision and sleep run over their
+        columns at once; then the awake creatures that think this tick sense (see `sense`),
+        their brains run in one batch (see BatchedBrainEvaluator) and they decide
+        (Creature.act), and all of them move at once. Every creature therefore
+        senses the world as it was before anyone moved. `think` flags per creature whether
+        it senses and thinks (None: all of them); the others keep steering as last decided.
+        The world, food and perception scheduler are read from `context` (the Simulation).
+        """
+        if not active: return
+        cols = self.columns
+        n = len(active)
+        rows = np.arange(n) if n == self.size else np.fromiter((c.row for c in active), dtype=np.intp, count=n)
+        kinds = cols['kind'][rows]
+
+        # --- Upkeep ---
+        state = cols['state'][rows]
+        age = cols['age'][rows] + 1
+        energy = cols['energy'][rows] - 0.25
+        tiredness = cols['tiredness'][rows]
+        tiredness = np.where(state != SLEEPING, tiredness + 0.1, tiredness)
+        urge = cols['reproduction_urge'][rows]
+        urge = np.where((energy > KINDS.urge_threshold[kinds]) & (age > 1000), np.minimum(1.0, urge + 0.005), urge)
+        time_of_day_norm = context.time_info['world_time'] / DAY_LENGTH
+        is_night = 0.25 < time_of_day_norm < 0.75
+        vision = KINDS.vision_radius[kinds] * np.where(is_night & ~cols['night_vision_gene'][rows], 0.3, 1.0)
+
+        # --- Sleep: arriving at the nest, resting and waking up ---
+        x, y, angle = cols['x'][rows], cols['y'][rows], cols['angle'][rows]
+        nest_x, nest_y = cols['nest_x'][rows], cols['nest_y'][rows]
+        arriving = (state == GOING_TO_SLEEP) & (np.hypot(x - nest_x, y - nest_y) < CELL_SIZE)
+        state[arriving] = SLEEPING
+        for i in np.flatnonzero(arriving).tolist(): angle[i] = random.uniform(0, 2 * math.pi)
+        sleeping = state == SLEEPING
+        max_energy = KINDS.max_energy[kinds]
+        tiredness = np.where(sleeping, np.maximum(0, tiredness - 1.5), tiredness)
+        energy = np.where(sleeping, np.minimum(max_energy, energy + 2.0), energy)
+        state[sleeping & (tiredness <= 0) & (energy > max_energy * 0.95)] = EXPLORING
+        cols['age'][rows], cols['energy'][rows], cols['tiredness'][rows] = age, energy, tiredness
+        cols['reproduction_urge'][rows], cols['state'][rows], cols['angle'][rows] = urge, state, angle
+
+        # --- Steering: home to the nest, as last decided, or sensed and thought afresh ---
+        outputs = np.zeros((n, 3))
+        going, sleeping = state == GOING_TO_SLEEP, state == SLEEPING
+        heading_home = np.flatnonzero(going)
+        if len(heading_home):
+            dx, dy = nest_x[heading_home] - x[heading_home], nest_y[heading_home] - y[heading_home]
+            distance = np.hypot(dx, dy)
+            lost = (distance == 0) | (distance > 10000)
+            distance[lost] = 1.0
+            angle_to_nest = np.where(lost, 0.0, np.arctan2(dy / distance, dx / distance))
+            outputs[heading_home, 0] = (angle_to_nest - angle[heading_home] + math.pi) % (2 * math.pi) - math.pi
+            outputs[heading_home, 1:] = 1.0, -1.0
+            for i, nx, ny in zip(heading_home.tolist(), nest_x[heading_home].tolist(), nest_y[heading_home].tolist()):
+                active[i].target = pygame.Rect(nx, ny, 1, 1)
+        for i in np.flatnonzero(sleeping).tolist(): active[i].target = None
+
+        thinking = []
+        for i in np.flatnonzero(~(going | sleeping)).tolist():
+            c = active[i]
+            if think is not None and not think[i] and c.outputs is not None: outputs[i] = c.outputs
+            else: thinking.append(i)
+        if thinking:
+            thinkers = [active[i] for i in thinking]
+            with PROFILER.phase('simulation.creatures.sense'):
+                inputs = self.sense(thinkers, rows[thinking], vision[thinking], time_of_day_norm, context)
+            with PROFILER.phase('simulation.creatures.brain'):
+                decisions = BRAINS.evaluate(thinkers, inputs)
+            outputs[thinking] = decisions
+            for c, decision in zip(thinkers, decisions.tolist()): c.act(decision)
+
+        # --- Movement ---
+        with PROFILER.phase('simulation.creatures.move'):
+            moving = np.flatnonzero(~sleeping)
+            self.move(rows[moving], outputs[moving], kinds[moving], context.world)
+
+    def move(self, rows, outputs, kinds, world):
+        """Steers and moves the creatures in `rows` by their brain `outputs`, bouncing off the world's edges and paying the terrain's energy cost."""
+        cols = self.columns
+        angle = cols['angle'][rows] + outputs[:, 0] * math.pi / 2
+        speed = KINDS.max_speed[kinds] * ((outputs[:, 1] + 1) / 2)
+        x, y = cols['x'][rows], cols['y'][rows]
+        new_x, new_y = x + np.cos(angle) * speed, y + np.sin(angle) * speed
+        inside = (0 <= new_x) & (new_x < world.pixel_width) & (0 <= new_y) & (new_y < world.pixel_height)
+        # A step that would leave the world turns the creature around instead
+        cols['angle'][rows] = np.where(inside, angle, angle + math.pi)
+        x, y = np.where(inside, new_x, x), np.where(inside, new_y, y)
+        cols['x'][rows], cols['y'][rows] = x, y
+        cost = world.energy_cost_grid()[(x // CELL_SIZE).astype(np.intp), (y // CELL_SIZE).astype(np.intp)]
+        cols['energy'][rows] -= (speed * 0.1) * cost
+
+    def sense(self, creatures, rows, vision, time_of_day_norm, context):
+        """
+        The brain inputs of `creatures` (in `rows`, seeing as far as `vision`), one row
+        each. Flee timers run down first; then whoever the context's PerceptionScheduler
+        calls for (everyone, without one) perceives afresh (see `perceive`) and the rest
+        recall their cached targets, at their current positions. The target vectors and
+        boids terms are then worked out for all of them at once.
+        """
+        cols, members, perception = self.columns, self.members, context.perception
+        k = len(creatures)
+        for i in np.flatnonzero(cols['state'][rows] == FLEEING).tolist():
+            c = creatures[i]
+            c.flee_timer -= 1
+            if c.flee_timer <= 0: cols['state'][rows[i]] = EXPLORING
+
+        visions = vision.tolist()
+        fresh = list(range(k)) if perception is None else [i for i in range(k) if perception.due(creatures[i], visions[i])]
+        looks = [None] * k
+        if fresh:
+            with PROFILER.phase('simulation.creatures.sense.neighbors'):
+                for i, look in zip(fresh, self.perceive(rows[fresh], vision[fresh], context)):
+                    looks[i] = look
+                    if perception:
+                        flock, targets = look[0], look[1:]
+                        perception.perceived(creatures[i], [members[r] for r in flock.tolist()], *targets)
+        if len(fresh) < k:
+            for i, look in enumerate(looks):
+                if look is None:
+                    cached = perception.recall(creatures[i])
+                    flock = np.fromiter((mate.row for mate in cached.flockmates), dtype=np.intp, count=len(cached.flockmates))
+                    looks[i] = (flock, *cached.targets())
+
+        x, y, angle = cols['x'][rows], cols['y'][rows], cols['angle'][rows]
+        states = cols['state'][rows].tolist()
+        # Target positions (NaN: none) of food, threat, mate and rival, in that order
+        targets = np.full((4, 2, k), np.nan)
+        flocks = []
+        for i, (flock, threat, panicked_mate, food, mate, rival) in enumerate(looks):
+            c = creatures[i]
+            if states[i] != FLEEING and (threat or panicked_mate):
+                states[i] = FLEEING
+                c.flee_timer = 150
+            if panicked_mate and not threat:
+                threat = {'x': x[i] - math.cos(panicked_mate.angle) * 100, 'y': y[i] - math.sin(panicked_mate.angle) * 100}
+            c.target = food or threat
+            for t, target in enumerate((food, threat, mate, rival)):
+                if not target: continue
+                if isinstance(target, dict): targets[t, :, i] = target['x'], target['y']
+                else: targets[t, :, i] = target.x, target.y
+            flocks.append(flock)
+        states = np.array(states, dtype=np.int8)
+        cols['state'][rows] = states
+
+        inputs = np.zeros((k, 22))
+        for t, column in enumerate((0, 2, 4, 9)):
+            inputs[:, column], inputs[:, column + 1] = _unit(targets[t, 0] - x, targets[t, 1] - y, vision)
+        inputs[:, 11], inputs[:, 12] = _unit(cols['nest_x'][rows] - x, cols['nest_y'][rows] - y, 10000)
+        inputs[:, 13] = time_of_day_norm
+        inputs[:, 14] = cols['tiredness'][rows] / 150.0
+        inputs[:, 21] = states == FLEEING
+
+        # Boids: each creature's sums over its flockmates' rows
+        with PROFILER.phase('simulation.creatures.sense.boids'):
+            counts = np.fromiter((len(flock) for flock in flocks), dtype=np.intp, count=k)
+            inputs[:, 6] = counts / 10.0
+            if counts.any():
+                owner = np.repeat(np.arange(k), counts)
+                mates = np.concatenate(flocks)
+                mates_x, mates_y, mates_angle = cols['x'][mates], cols['y'][mates], cols['angle'][mates]
+                flocking = counts > 0
+                size = np.maximum(counts, 1)
+                center_x = np.bincount(owner, weights=mates_x, minlength=k) / size
+                center_y = np.bincount(owner, weights=mates_y, minlength=k) / size
+                to_center_x, to_center_y = np.where(flocking, center_x - x, 0.0), np.where(flocking, center_y - y, 0.0)
+                inputs[:, 7], inputs[:, 8] = _unit(to_center_x, to_center_y, vision)
+                inputs[:, 15], inputs[:, 16] = _unit(to_center_x, to_center_y)
+                inputs[:, 17], inputs[:, 18] = _unit(np.bincount(owner, weights=np.cos(mates_angle), minlength=k),
+                                                     np.bincount(owner, weights=np.sin(mates_angle), minlength=k))
+                away_x, away_y = x[owner] - mates_x, y[owner] - mates_y
+                close = np.hypot(away_x, away_y) < CELL_SIZE * 2.5
+                inputs[:, 19], inputs[:, 20] = _unit(np.bincount(owner[close], weights=away_x[close], minlength=k),
+                                                     np.bincount(owner[close], weights=away_y[close], minlength=k))
+        return inputs
+
+    def perceive(self, rows, vision, context):
+        """
+        Fresh looks around for the creatures in `rows`, seeing as far as `vision`: per
+        creature, the rows of its flockmates and its threat, panicked mate, food or prey,
+        mate and rival. The distances to the other creatures and to the food items are
+        worked out a block of perceivers at a time (sorted by x, each block only against
+        the band of x it can see), and masks by tribe and archetype pick the targets, ties
+        going to the first in list order.
+        """
+        cols, members, n = self.columns, self.members, self.size
+        all_x, all_y = cols['x'][:n], cols['y'][:n]
+        kind, tribe = cols['kind'][:n], cols['tribe_id'][:n]
+        fleeing, in_season = cols['state'][:n] == FLEEING, cols['reproduction_urge'][:n] > 0.9
+        vegetation = context.vegetation
+        foods = context.foods if vegetation is None else []
+        foods_x = np.fromiter((f.x for f in foods), dtype=np.float64, count=len(foods))
+        foods_y = np.fromiter((f.y for f in foods), dtype=np.float64, count=len(foods))
+        by_x = np.argsort(all_x, kind='stable')
+        sorted_x = all_x[by_x]
+
+        looks = [None] * len(rows)
+        order = np.argsort(all_x[rows], kind='stable')
+        block = max(1, BLOCK_ENTRIES // (n + len(foods)))
+        for start in range(0, len(rows), block):
+            part = order[start:start + block]
+            own, reach = rows[part], vision[part]
+            own_x, own_y, own_kind = all_x[own], all_y[own], kind[own]
+            far = reach.max()
+            seen_rows = np.sort(by_x[np.searchsorted(sorted_x, own_x.min() - far):np.searchsorted(sorted_x, own_x.max() + far, 'right')])
+            distances = np.hypot(all_x[seen_rows] - own_x[:, None], all_y[seen_rows] - own_y[:, None])
+            seen = (distances < reach[:, None]) & (seen_rows != own[:, None])
+            seen_kind = kind[seen_rows]
+            same_tribe = tribe[seen_rows] == tribe[own][:, None]
+            flock = seen & same_tribe & (seen_kind == own_kind[:, None])
+            threats = _nearest(seen & KINDS.fears[own_kind][:, seen_kind], distances).tolist()
+            panicking = flock & fleeing[seen_rows]
+            panicked = np.where(panicking.any(1), panicking.argmax(1), -1).tolist()
+            mates = _nearest(flock & in_season[seen_rows] & in_season[own][:, None], distances).tolist()
+            rivals = _nearest(seen & ~same_tribe, distances).tolist()
+            hunting = seen & KINDS.hunts[own_kind][:, seen_kind] & KINDS.meat[own_kind][:, None]
+            hunters = set(np.flatnonzero(hunting.any(1)).tolist())
+            grazing = KINDS.plants[own_kind]
+            if len(foods):
+                food_distances = np.hypot(foods_x - own_x[:, None], foods_y - own_y[:, None])
+                nearest_foods = _nearest((food_distances < reach[:, None]) & grazing[:, None], food_distances).tolist()
+            flock_counts = flock.sum(1)
+            flocks = np.split(seen_rows[np.nonzero(flock)[1]], np.cumsum(flock_counts)[:-1])
+
+            def member(j): return members[seen_rows[j]] if j >= 0 else None
+            own_x, own_y, reach = own_x.tolist(), own_y.tolist(), reach.tolist()
+            for p, i in enumerate(part.tolist()):
+                plant = None
+                if vegetation is not None:
+                    # Vegetation grid: the closest cell with a bite left, from a look at the cells around
+                    if grazing[p]: plant = vegetation.nearest(own_x[p], own_y[p], reach[p])
+                elif len(foods) and nearest_foods[p] >= 0:
+                    plant = foods[nearest_foods[p]]
+                food = plant
+                if p in hunters:
+                    prey = members[own[p]].find_best_prey([members[r] for r in seen_rows[hunting[p]].tolist()])
+                    food = prey or plant
+                    if prey and plant:
+                        food = prey if math.hypot(own_x[p] - prey.x, own_y[p] - prey.y) < math.hypot(own_x[p] - plant.x, own_y[p] - plant.y) else plant
+                looks[i] = (flocks[p], member(threats[p]), member(panicked[p]), food, member(mates[p]), member(rivals[p]))
+        return looks
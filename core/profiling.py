@@ -0,0 +1,88 @@
+import os
+import csv
+import json
+import time
+from collections import deque
+from settings import PROFILING, PROFILER_WINDOW
+
+
+class _Phase:
+    """Context manager that adds the time spent inside it to one phase."""
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer, self.name = timer, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase:
+    __slots__ = ()
+    def __enter__(self): pass
+    def __exit__(self, *exc): pass
+
+_NO_PHASE = _NoPhase()
+
+
+class PhaseTimer:
+    """
+    Rolling per-phase timings. Phases are dotted names ('simulation.creatures.brain'),
+    so nested phases are reported under their parent. Time is accumulated into the
+    current sample (one frame in main.py, one tick in headless runs) and the last
+    `window` samples are kept for the mean/max statistics.
+
+    When disabled, `phase()` returns a shared no-op context manager and hot loops
+    check `enabled` before reading the clock, so the cost is one attribute lookup.
+    """
+
+    def __init__(self, enabled=PROFILING, window=PROFILER_WINDOW):
+        self.enabled = enabled
+        self.current = {}
+        self.samples = deque(maxlen=window)
+        self._dumps = []
+
+    def phase(self, name):
+        return _Phase(self, name) if self.enabled else _NO_PHASE
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def end_sample(self):
+        """Closes the current sample (call once per frame or tick)."""
+        if self.enabled:
+            self.samples.append(self.current)
+            self.current = {}
+
+    def reset(self):
+        self.current = {}
+        self.samples.clear()
+
+    def summary(self):
+        """{phase: (mean ms, max ms)} over the window, parents before their children."""
+        if not self.samples: return {}
+        names = sorted({name for sample in self.samples for name in sample})
+        count = len(self.samples)
+        return {name: (sum(s.get(name, 0.0) for s in self.samples) / count * 1000,
+                       max(s.get(name, 0.0) for s in self.samples) * 1000) for name in names}
+
+    def dump(self, path, tick):
+        """Writes the current summary to a .csv (appending rows) or .json (rewriting the list) file."""
+        summary = self.summary()
+        if path.endswith('.json'):
+            self._dumps.append({'tick': tick, 'phases': {name: {'mean_ms': mean, 'max_ms': peak}
+                                                         for name, (mean, peak) in summary.items()}})
+            with open(path, 'w') as f: json.dump(self._dumps, f, indent=1)
+            return
+        new_file = not os.path.exists(path)
+        with open(path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file: writer.writerow(['tick', 'phase', 'mean_ms', 'max_ms'])
+            for name, (mean, peak) in summary.items():
+                writer.writerow([tick, name, f"{mean:.4f}", f"{peak:.4f}"])
+
+
+PROFILER = PhaseTimer()
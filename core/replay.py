@@ -0,0 +1,139 @@
+"""
+A recording is a directory with:
+
+    checkpoint_<tick>.npz   keyframes (full or delta snapshots, see core/snapshot.py),
+                            which include the `random` state
+    events.jsonl            one JSON event per line, each with its 'tick' and 'type'
+    recording.json          first and last recorded tick
+
+The simulation is deterministic given its state, so the only inputs a replay needs
+besides the keyframes are the viewer's inputs: god-mode 'tool' events and 'focus'
+events (the camera's level-of-detail chunk). An input event stamped with tick T was
+applied after tick T and before tick T + 1. Evolution events fix the tick
+at which each new generation was swapped in (it may have been computed in the
+background for a while). All other events (spawns, deaths, kills, births) are
+there to be read, not replayed.
+"""
+import os
+import json
+import time
+import bisect
+import shutil
+
+from settings import REPLAY_KEYFRAME_EVERY, REPLAY_MAX_RECORDINGS
+from core.snapshot import SnapshotWriter, load_snapshot
+
+EVENTS_FILE = "events.jsonl"
+RECORDING_FILE = "recording.json"
+KEYFRAME_PREFIX = "checkpoint_"
+
+
+class ReplayRecorder:
+    """Records a run: keyframes every `keyframe_every` ticks (written in the background) and the event stream."""
+
+    def __init__(self, directory, keyframe_every=REPLAY_KEYFRAME_EVERY):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keyframes = SnapshotWriter(directory, keyframe_every)
+        self.events_file = open(os.path.join(directory, EVENTS_FILE), 'a', encoding='utf-8')
+        self.start_tick = None
+
+    def start(self, sim):
+        """Starts recording `sim` from its current tick with a first keyframe."""
+        sim.events = []
+        self.start_tick = sim.tick
+        self.keyframes.checkpoint(sim)
+
+    def after_tick(self, sim):
+        self.keyframes.after_tick(sim)
+        self.write_events(sim)
+
+    def write_events(self, sim):
+        """Appends the events gathered since the last call to the log (tool events happen between ticks)."""
+        for event in sim.events:
+            self.events_file.write(json.dumps(event) + '\n')
+        sim.events.clear()
+
+    def close(self, sim):
+        self.write_events(sim)
+        sim.events = None
+        self.events_file.close()
+        self.keyframes.close()
+        with open(os.path.join(self.directory, RECORDING_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'start_tick': self.start_tick, 'end_tick': sim.tick}, f)
+
+
+RECORDING_PREFIX = "run_"
+
+
+def new_recording_dir(root, keep=REPLAY_MAX_RECORDINGS):
+    """
+    A fresh, timestamped recording directory under `root`. The oldest recordings
+    there are deleted so that, with the new one, at most `keep` are left.
+    """
+    if os.path.isdir(root):
+        recordings = sorted(name for name in os.listdir(root)
+                            if name.startswith(RECORDING_PREFIX) and os.path.isdir(os.path.join(root, name)))
+        for name in recordings[:max(0, len(recordings) - keep + 1)]:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    path = base = os.path.join(root, time.strftime(f"{RECORDING_PREFIX}%Y%m%d_%H%M%S"))
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = f"{base}_{suffix}"
+    return path
+
+
+def read_events(directory):
+    with open(os.path.join(directory, EVENTS_FILE), encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Replay:
+    """
+    Plays a recording back into a Simulation. `seek(tick)` restores the nearest
+    keyframe at or before `tick` (or keeps going from the current state if that is
+    closer) and fast-forwards to it headlessly, re-applying recorded inputs.
+    """
+
+    def __init__(self, sim, directory):
+        self.sim, self.directory = sim, directory
+        self.loaded = False
+        names = sorted(name for name in os.listdir(directory) if name.startswith(KEYFRAME_PREFIX) and name.endswith('.npz'))
+        if not names: raise FileNotFoundError(f"No keyframes in recording {directory}")
+        self.keyframe_ticks = [int(name[len(KEYFRAME_PREFIX):-len('.npz')]) for name in names]
+        self.keyframe_names = names
+        self.events = read_events(directory)
+        self.inputs = {}
+        for event in self.events:
+            if event['type'] in ('tool', 'focus'): self.inputs.setdefault(event['tick'], []).append(event)
+        sim.evolution.swap_ticks = {event['tick'] for event in self.events if event['type'] == 'evolution'}
+
+        self.start_tick = self.keyframe_ticks[0]
+        self.end_tick = max([self.keyframe_ticks[-1]] + [event['tick'] for event in self.events])
+        info_path = os.path.join(directory, RECORDING_FILE)
+        if os.path.exists(info_path):
+            with open(info_path, encoding='utf-8') as f:
+                self.end_tick = json.load(f)['end_tick']
+
+    def step(self):
+        """Advances the replayed simulation one tick, applying the inputs recorded before it."""
+        for event in self.inputs.get(self.sim.tick, ()):
+            if event['type'] == 'tool': self.sim.apply_tool(event['tool'], tuple(event['pos']))
+            else: self.sim.set_focus(tuple(event['chunk']))
+        self.sim.step()
+
+    def seek(self, tick):
+        """Moves the simulation to `tick` (clamped to the recording)."""
+        tick = max(self.start_tick, min(self.end_tick, tick))
+        i = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        if not (self.loaded and self.keyframe_ticks[i] <= self.sim.tick <= tick):
+            load_snapshot(self.sim, os.path.join(self.directory, self.keyframe_names[i]))
+            self.loaded = True
+        while self.sim.tick < tick:
+            self.step()
+        return self.sim
+
+    def events_between(self, first_tick, last_tick):
+        """Recorded events with first_tick <= tick <= last_tick."""
+        return [event for event in self.events if first_tick <= event['tick'] <= last_tick]
@@ -0,0 +1,75 @@
+import time
+from settings import (BASE_TICK_RATE, SIMULATION_SPEEDS, RENDER_FPS, FAST_FORWARD_SPEED,
+                      FAST_FORWARD_RENDER_FPS, SIMULATION_TIME_BUDGET)
+
+
+class TickScheduler:
+    """
+    Fixed-timestep scheduler for the interactive front-end. At speed N the
+    simulation advances N * BASE_TICK_RATE ticks per real second, however many
+    frames are drawn. Each loop iteration runs the ticks that are due, for at most
+    SIMULATION_TIME_BUDGET of a frame, and rendering runs at its own rate (lower
+    while fast-forwarding). A speed of None means "max": tick for the whole budget.
+    Only the pacing changes; every tick is the same `Simulation.step`.
+    """
+
+    def __init__(self, speeds=SIMULATION_SPEEDS, tick_rate=BASE_TICK_RATE):
+        self.speeds = speeds
+        self.tick_rate = tick_rate
+        self.speed_index = 0
+        self.paused = False
+        self.accumulator = 0.0
+        self.last_time = None
+        self.last_render = None
+        self.ticks_per_sec = 0.0
+
+    @property
+    def speed(self):
+        return self.speeds[self.speed_index]
+
+    @property
+    def label(self):
+        return "max" if self.speed is None else f"{self.speed}x"
+
+    def faster(self):
+        self.speed_index = min(len(self.speeds) - 1, self.speed_index + 1)
+
+    def slower(self):
+        self.speed_index = max(0, self.speed_index - 1)
+
+    def advance(self, step):
+        """Calls `step` once per due tick, within the frame's time budget. Returns the ticks run."""
+        now = time.perf_counter()
+        elapsed = now - self.last_time if self.last_time is not None else 0.0
+        self.last_time = now
+        if self.paused:
+            self.accumulator = 0.0
+            return 0
+
+        deadline = now + SIMULATION_TIME_BUDGET / RENDER_FPS
+        ticks = 0
+        if self.speed is None:
+            while True:
+                step(); ticks += 1
+                if time.perf_counter() >= deadline: break
+        else:
+            self.accumulator += elapsed * self.tick_rate * self.speed
+            while self.accumulator >= 1.0:
+                step(); ticks += 1
+                self.accumulator -= 1.0
+                if time.perf_counter() >= deadline:
+                    # Slower than real time at this speed: drop the backlog instead of spiralling
+                    self.accumulator = 0.0
+                    break
+        if elapsed > 0: self.ticks_per_sec = ticks / elapsed
+        return ticks
+
+    def render_due(self):
+        """True when a frame should be drawn now, at RENDER_FPS or the fast-forward rate."""
+        fast_forward = not self.paused and (self.speed is None or self.speed >= FAST_FORWARD_SPEED)
+        fps = FAST_FORWARD_RENDER_FPS if fast_forward else RENDER_FPS
+        now = time.perf_counter()
+        if self.last_render is not None and now - self.last_render < 1.0 / fps:
+            return False
+        self.last_render = now
+        return True
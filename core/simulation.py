@@ -0,0 +1,222 @@
+import math
+import random
+import neat
+
+from settings import (CELL_SIZE, SEASON_LENGTH, NUMBER_OF_TRIBES_PER_SPECIES, TRIBE_COLORS,
+                      CHUNK_CELLS, LOD_FULL_RADIUS, LOD_THINK_EVERY,
+                      PERCEPTION_REFRESH_EVERY, VEGETATION_GRID)
+from entities.archetypes import CREATURE_ARCHETYPES
+from entities.creature import Creature
+from entities.food import Food
+from core.world_management import generate_world, manage_environment
+from core.spatial import SpatialIndex
+from core.population import PopulationStore
+from core.perception import PerceptionScheduler
+from core.sleep import SleepSchedule
+from core.vegetation import Vegetation
+from core.interactions import resolve_interactions
+from core.brains import NETWORK_CACHE
+from core.evolution import EvolutionRunner
+from core.statistics import PopulationHistory
+from core.profiling import PROFILER
+from rendering.assets import generate_visual_assets
+
+# God-mode spawn tools and the archetype each one creates
+TOOL_ARCHETYPES = {
+    "spawn_herbivore": "herbivore_generic",
+    "spawn_carnivore": "carnivore_generic",
+    "spawn_human": "human",
+    "spawn_feline": "feline"
+}
+
+
+class Simulation:
+    """
+    Owns the whole ecosystem state and advances it one tick at a time.
+    It has no knowledge of the window, events or drawing, so the same stepping
+    code drives the interactive front-end (main.py) and headless runs (headless.py).
+    """
+
+    def __init__(self, config, seed=None, background_evolution=False):
+        if seed is not None: random.seed(seed)
+        self.config = config
+        self.neat_population = neat.Population(config)
+        self.neat_population.add_reporter(neat.StdOutReporter(True))
+        self.neat_population.add_reporter(neat.StatisticsReporter())
+
+        self.assets = generate_visual_assets()
+        self.world = generate_world(seed if seed is not None else random.randint(0, 1000))
+
+        # --- Initial Population ---
+        # Creatures keep their state in the store's columns, in the order of `creatures`
+        self.population = PopulationStore()
+        self.creatures = []
+        initial_genomes = list(self.neat_population.population.values())
+        archetype_list = list(CREATURE_ARCHETYPES.keys())
+        for i, genome in enumerate(initial_genomes):
+            genome.fitness = 0
+            tribe_id = i % NUMBER_OF_TRIBES_PER_SPECIES
+            tribe_color = TRIBE_COLORS[tribe_id]
+            archetype = CREATURE_ARCHETYPES[archetype_list[i % len(archetype_list)]]
+            self.creatures.append(Creature(self, genome, archetype, tribe_id, tribe_color))
+
+        # Plants are either food items or, with VEGETATION_GRID, a biomass field over the terrain grid
+        self.vegetation = Vegetation(self.world) if VEGETATION_GRID else None
+        self.foods = [Food(self) for _ in range(150)] if self.vegetation is None else []
+        self.time_info = {'world_time': 0, 'season_timer': 0, 'current_season': "Primavera"}
+        self.tick = 0
+        self.generation_timer = 0
+        self.population_history = PopulationHistory(archetype['name'] for archetype in CREATURE_ARCHETYPES.values())
+        # Spreads the creatures' neighbor queries over several ticks (None: everyone perceives every tick)
+        self.perception = PerceptionScheduler() if PERCEPTION_REFRESH_EVERY > 1 else None
+        self.spatial = SpatialIndex(by_name=self.perception is not None)
+        # Sleepers are left out of the updates until they may wake up
+        self.sleep = SleepSchedule()
+        # When a list, each tick appends its events (spawns, deaths, kills, births, tools, evolution)
+        self.events = None
+        # Headless runs evolve on the spot; the window evolves in a worker process and keeps ticking
+        self.evolution = EvolutionRunner(background_evolution)
+        # Chunk the viewer is looking at; creatures far from it think less often (None: everyone always thinks)
+        self.focus = None
+        self.recount()
+
+    def recount(self):
+        """Rebuilds the per-archetype counts, after `creatures` was replaced wholesale."""
+        self.counts = {archetype['name']: 0 for archetype in CREATURE_ARCHETYPES.values()}
+        for c in self.creatures: self.counts[c.name] += 1
+
+    def creature_counts(self):
+        return dict(self.counts)
+
+    def food_amount(self):
+        """Food in the world, in plants: the food items, or the total biomass of the vegetation grid."""
+        if self.vegetation is None: return len(self.foods)
+        return round(float(self.vegetation.biomass.sum()), 1)
+
+    def apply_tool(self, tool, pos):
+        """Uses a god-mode tool at a world position."""
+        self._record({'type': 'tool', 'tool': tool, 'pos': list(pos)})
+        genome = random.choice(list(self.neat_population.population.values()))
+        tribe_id = random.randint(0, NUMBER_OF_TRIBES_PER_SPECIES - 1)
+        tribe_color = TRIBE_COLORS[tribe_id]
+        if tool == "spawn_food" and self.vegetation is not None:
+            self.vegetation.plant(*pos)
+        elif tool == "spawn_food":
+            self.foods.append(Food(self, pos))
+            self.sleep.food_appeared(self.foods[-1])
+        elif tool in TOOL_ARCHETYPES:
+            archetype = CREATURE_ARCHETYPES[TOOL_ARCHETYPES[tool]]
+            self.creatures.append(Creature(self, genome, archetype, tribe_id, tribe_color, nest_pos=pos))
+            self.counts[archetype['name']] += 1
+            self._record({'type': 'spawn', 'uid': self.creatures[-1].uid, 'name': archetype['name']})
+        elif tool == "smite":
+            for c in self.creatures:
+                if math.hypot(pos[0]-c.x, pos[1]-c.y) < CELL_SIZE:
+                    self.counts[c.name] -= 1
+                    self._record({'type': 'death', 'uid': c.uid, 'name': c.name, 'cause': 'smite'})
+            self.creatures[:] = [c for c in self.creatures if math.hypot(pos[0]-c.x, pos[1]-c.y) >= CELL_SIZE]
+
+    def focus_on(self, x, y):
+        """Sets the level-of-detail focus to the chunk holding world point (x, y)."""
+        size = CHUNK_CELLS * CELL_SIZE
+        self.set_focus((int(x // size), int(y // size)))
+
+    def set_focus(self, chunk):
+        # Recorded, since it changes which creatures think and so the course of the run
+        if chunk != self.focus:
+            self.focus = chunk
+            self._record({'type': 'focus', 'chunk': list(chunk)})
+
+    def thinking_flags(self, creatures):
+        """
+        Level of detail: per creature of `creatures`, whether it senses and thinks this tick. Creatures
+        more than LOD_FULL_RADIUS chunks from the focus only think every LOD_THINK_EVERY
+        ticks (staggered by uid) and otherwise keep steering as last decided.
+        Returns None when everyone thinks (no focus, or the whole world is near it).
+        """
+        if self.focus is None: return None
+        fx, fy = self.focus
+        radius = LOD_FULL_RADIUS
+        last_x, last_y = (self.world.width - 1) // CHUNK_CELLS, (self.world.height - 1) // CHUNK_CELLS
+        if fx - radius <= 0 and fx + radius >= last_x and fy - radius <= 0 and fy + radius >= last_y: return None
+        size, every, tick = CHUNK_CELLS * CELL_SIZE, LOD_THINK_EVERY, self.tick
+        return [(abs(int(c.x // size) - fx) <= radius and abs(int(c.y // size) - fy) <= radius)
+                or (c.uid + tick) % every == 0 for c in creatures]
+
+    def _record(self, event):
+        if self.events is not None: self.events.append({'tick': self.tick, **event})
+
+    def step(self):
+        """Advances the simulation by one tick: environment, creatures, interactions and evolution."""
+        food_count = len(self.foods)
+        with PROFILER.phase('simulation.environment'):
+            self.time_info = manage_environment(self.time_info, self.foods, self)
+        self.generation_timer += 1
+        self.tick += 1
+        if len(self.foods) > food_count:
+            self._record({'type': 'food_spawn', 'x': self.foods[-1].x, 'y': self.foods[-1].y})
+            for food in self.foods[food_count:]: self.sleep.food_appeared(food)
+
+        with PROFILER.phase('simulation.spatial'):
+            self.spatial.rebuild(self.creatures, self.foods)
+        if self.perception: self.perception.start_tick(self.tick, self.spatial, self.vegetation)
+        with PROFILER.phase('simulation.creatures'):
+            self.population.sync(self.creatures)
+            self.sleep.start_tick(self.tick, self.spatial)
+            active = self.sleep.active(self.creatures)
+            self.population.update(active, self.thinking_flags(active), self)
+            # Everyone moved at once, so the neighbor index is rebuilt once for the interactions
+            self.spatial.rebuild_creatures(self.creatures)
+
+        with PROFILER.phase('simulation.interactions'):
+            events = [] if self.events is not None else None
+            resolve_interactions(self.creatures, self.foods, self.spatial, events, self.counts, self.sleep, self.vegetation)
+            for event in events or (): self._record(event)
+            age_of = self.sleep.age_of
+            for c in self.creatures: c.genome.fitness = age_of(c)
+        self.sleep.end_tick(self.creatures, self.spatial)
+
+        if self.time_info['world_time'] == 0:
+            self.population_history.append(self.counts)
+
+        if not self.evolution.pending and self.generation_timer > SEASON_LENGTH * 2:
+            with PROFILER.phase('simulation.evolution'):
+                self.start_evolution()
+        if self.evolution.pending and self.evolution.ready(self.tick):
+            with PROFILER.phase('simulation.evolution'):
+                self.finish_evolution()
+
+    def start_evolution(self):
+        """Fixes the fitness of every genome as of now and starts one NEAT generation."""
+        print("\n--- EVOLVING BRAINS ---")
+        # Fitness of a genome is that of the last creature carrying it; genomes no creature
+        # received keep any fitness they already have (e.g. migrants) or score 0
+        fitness = {g_id: g.fitness or 0 for g_id, g in self.neat_population.population.items()}
+        carried = {c.genome.key: c.genome.fitness for c in self.creatures}
+        fitness.update(carried)
+        self.evolution.start(self.neat_population, {
+            'tick': self.tick, 'seed': random.getrandbits(32),
+            'best_fitness': max(carried.values(), default=0), 'fitness': fitness,
+        })
+
+    def finish_evolution(self):
+        """Swaps in the evolved population and redistributes the new brains."""
+        job = self.evolution.job
+        population = self.evolution.collect()
+        if population is not self.neat_population:
+            # Evolved in a worker: adopt its copy, sharing this process's config and node ids
+            self.config.genome_config.node_indexer = population.config.genome_config.node_indexer
+            population.config = self.config
+            self.neat_population = population
+        NETWORK_CACHE.retain(population.population)
+        genomes = list(population.population.values())
+        for genome in genomes: genome.fitness = 0
+        for c in self.creatures: c.genome = random.choice(genomes); c.net = NETWORK_CACHE.get(c.genome, self.config)
+        self.generation_timer = 0
+        self._record({'type': 'evolution', 'generation': population.generation,
+                      'best_fitness': job['best_fitness'], 'started': job['tick']})
+
+    def evolve(self):
+        """Runs one NEAT generation to completion and redistributes the new brains."""
+        if not self.evolution.pending: self.start_evolution()
+        self.finish_evolution()
@@ -0,0 +1,89 @@
+import heapq
+from settings import CELL_SIZE
+
+
+class SleepSchedule:
+    """
+    Event-driven sleep. A sleeping creature only ages and rests (see
+    Creature.sleep_through), so once asleep it is parked: left out of the creature
+    updates and of its own interactions until the tick it may first wake up, die of
+    old age or start to look like a mate (Creature.ticks_of_sound_sleep), which is
+    computed when it falls asleep. Parked creatures stay in the world and in the
+    neighbor index (they do not move); their energy, age, tiredness and urge are
+    brought up to date lazily with `settle()` when something needs them.
+
+    A parked creature is woken early when food appears within its reach (it would
+    eat it) or when it catches prey. On a vegetation grid sleepers do not graze, so
+    regrowth never needs to wake anyone. Waking early is always safe: it then simply
+    sleeps through normal updates again, so runs are the same with or without it.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        # Number of parked creatures, recounted every tick (an overestimate in between)
+        self.parked = 0
+        self._wake_ups = []
+        self._new_foods = []
+
+    def clear(self, tick):
+        """Forgets every parked creature (after the population was replaced wholesale)."""
+        self.tick, self.parked = tick, 0
+        self._wake_ups.clear()
+        self._new_foods.clear()
+
+    def active(self, creatures):
+        """The creatures to update this tick (all of them but the parked ones), in list order."""
+        if not self.parked: return creatures
+        return [c for c in creatures if c.asleep_since is None]
+
+    def food_appeared(self, food):
+        self._new_foods.append(food)
+
+    def start_tick(self, tick, spatial):
+        """Wakes the creatures due this tick (and those near new food), as of the end of the last tick."""
+        self.tick = tick
+        for food in self._new_foods:
+            for c in spatial.creatures.query(food.x, food.y, CELL_SIZE):
+                if c.asleep_since is not None and c.diet['plants']: self.wake(c, tick - 1)
+        self._new_foods.clear()
+        wake_ups = self._wake_ups
+        while wake_ups and wake_ups[0][0] <= tick:
+            _, _, c = heapq.heappop(wake_ups)
+            # Creatures that died (or were already woken) since are skipped
+            if c.asleep_since is not None and c in spatial.creatures: self.wake(c, tick - 1)
+
+    def end_tick(self, creatures, spatial):
+        """Parks the creatures that are sound asleep after this tick."""
+        tick, parked = self.tick, 0
+        for c in creatures:
+            if c.asleep_since is not None:
+                parked += 1
+                continue
+            if c.state != 'sleeping': continue
+            # A grazer with food in reach would eat it on its next interaction
+            if c.diet['plants'] and spatial.foods.query(c.x, c.y, CELL_SIZE): continue
+            ticks = c.ticks_of_sound_sleep()
+            if ticks <= 1: continue
+            c.asleep_since = tick
+            heapq.heappush(self._wake_ups, (tick + ticks, c.uid, c))
+            parked += 1
+        self.parked = parked
+
+    def settle(self, creature, tick=None):
+        """Brings a parked creature's state up to the end of `tick` (default: the current one)."""
+        if creature.asleep_since is None: return
+        tick = self.tick if tick is None else tick
+        creature.sleep_through(tick - creature.asleep_since)
+        creature.asleep_since = tick
+
+    def wake(self, creature, tick=None):
+        """Settles a parked creature and puts it back into the normal updates."""
+        if creature.asleep_since is None: return
+        self.settle(creature, tick)
+        creature.asleep_since = None
+        self.parked -= 1
+
+    def age_of(self, creature):
+        """A creature's current age, without settling it."""
+        if creature.asleep_since is None: return creature.age
+        return creature.age + self.tick - creature.asleep_since
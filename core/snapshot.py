@@ -0,0 +1,392 @@
+"""
+Snapshot layout (one .npz file, loadable without pickle except for the genome blob):
+
+    meta              JSON: version, kind ('full' or 'delta'), base file of a delta,
+                      tick, timers, time_info, population history, RNG state, NEAT generation
+                      and the next value of every id counter (genomes, species, nodes, creatures),
+                      plus the NEAT generation still being evolved, if any (seed and fitness),
+                      and the level-of-detail focus chunk
+    terrain           uint8 (width, height) terrain ids (full snapshots only)
+    genomes           pickled genomes; in a full snapshot also the NEAT population and
+                      species, in a delta only the genomes its base does not have
+    creature/<name>   one column per creature attribute, plus genome/archetype/state indices
+                      and the cached perception (targets by creature uid, food index or grid cell)
+    food/<name>       x, y and energy of every food item
+    vegetation        float64 (width, height) biomass of the vegetation grid, when there is one
+
+A delta is only valid next to its base full snapshot, and always refers to that
+base directly (deltas are cumulative), so loading one costs at most two reads.
+"""
+import os
+import json
+import math
+import queue
+import pickle
+import random
+import itertools
+import threading
+import numpy as np
+
+from settings import SNAPSHOT_FULL_EVERY
+from entities.archetypes import CREATURE_ARCHETYPES
+from entities.creature import Creature, PATTERN_TYPES
+from entities.food import Food
+from core.world_management import WorldMap
+from core.brains import NETWORK_CACHE
+from core.statistics import PopulationHistory
+from core.perception import Perception
+from core.vegetation import Vegetation, Patch
+from core.population import STATE_CODES, STATE_NAMES
+
+SNAPSHOT_VERSION = 7
+# Versions this code can load (version 1 had no creature uids or id counters,
+# version 2 no pending evolution, version 3 kept the population history as a plain list,
+# version 4 had no level-of-detail focus or last brain outputs, version 5 no cached perceptions,
+# version 6 no vegetation grid)
+READABLE_VERSIONS = (1, 2, 3, 4, 5, 6, 7)
+
+# Per-creature attributes stored as one column each, with their on-disk dtype
+CREATURE_COLUMNS = {
+    'x': np.float64, 'y': np.float64, 'angle': np.float64, 'energy': np.float64,
+    'age': np.int64, 'reproduction_urge': np.float64, 'tiredness': np.float64,
+    'flee_timer': np.int64, 'night_vision_gene': bool,
+    'nest_x': np.float64, 'nest_y': np.float64, 'tribe_id': np.int16, 'uid': np.int64,
+}
+ARCHETYPE_KEYS = list(CREATURE_ARCHETYPES)
+NO_OUTPUTS = (np.nan, np.nan, np.nan)
+# Perception targets stored by creature uid, in this order (-1: none); food is stored apart, by index or grid cell
+PERCEPTION_TARGETS = ('threat', 'panicked_mate', 'food', 'mate', 'rival')
+
+
+def _column(values, dtype, count):
+    return np.fromiter(values, dtype=dtype, count=count)
+
+
+def _next_value(obj, attr):
+    """Next value of the itertools.count in `obj.attr` (None if unset), without consuming it."""
+    counter = getattr(obj, attr)
+    if counter is None: return None
+    value = next(counter)
+    setattr(obj, attr, itertools.count(value))
+    return value
+
+
+def _blob(obj):
+    return np.frombuffer(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+
+class _Base:
+    """What a delta needs to know about the full snapshot it builds on."""
+
+    def __init__(self, name, world, genomes, population_keys, generation):
+        self.name = name
+        self.world = world
+        self.genomes = genomes  # keeps the objects alive, so their ids stay valid
+        self.genome_index = {id(g): i for i, g in enumerate(genomes)}
+        self.population_keys = population_keys
+        self.generation = generation
+        self.deltas = 0
+
+    def covers(self, sim):
+        p = sim.neat_population
+        return (sim.world is self.world and p.generation == self.generation
+                and self.population_keys == frozenset(p.population))
+
+
+def _evolution_job(job):
+    if job is None: return None
+    return {**job, 'fitness': [[key, fitness] for key, fitness in job['fitness'].items()]}
+
+
+def _perception_arrays(creatures, foods):
+    """Columns for the creatures' cached perceptions (see core/perception.py)."""
+    food_index = {id(f): i for i, f in enumerate(foods)}
+    ticks, targets, food, patches, flock_counts, flock = [], [], [], [], [], []
+    for c in creatures:
+        perception = c.perception
+        if perception is None:
+            ticks.append(-1)
+            targets.append((-1,) * len(PERCEPTION_TARGETS))
+            food.append(-1)
+            patches.append(-1)
+            flock_counts.append(0)
+            continue
+        ticks.append(perception.tick)
+        # A target no longer in the world is saved as missing (-2), which drops the perception on load
+        targets.append(tuple(-1 if target is None or isinstance(target, (Food, Patch)) else target.uid
+                             for target in (getattr(perception, name) for name in PERCEPTION_TARGETS)))
+        food.append(food_index.get(id(perception.food), -2) if isinstance(perception.food, Food) else -1)
+        patches.append(perception.food.cell if isinstance(perception.food, Patch) else -1)
+        flock_counts.append(len(perception.flockmates))
+        flock.extend(mate.uid for mate in perception.flockmates)
+    n = len(creatures)
+    return {
+        'creature/perception_tick': np.array(ticks, dtype=np.int64),
+        'creature/perception_targets': np.array(targets, dtype=np.int64).reshape(n, len(PERCEPTION_TARGETS)),
+        'creature/perception_food': np.array(food, dtype=np.int64),
+        'creature/perception_patch': np.array(patches, dtype=np.int64),
+        'creature/perception_flock_count': np.array(flock_counts, dtype=np.int32),
+        'perception_flock': np.array(flock, dtype=np.int64),
+    }
+
+
+def _restore_perceptions(arrays, creatures, foods, vegetation=None):
+    """Points the loaded creatures' perceptions back at the loaded creatures, food and vegetation grid."""
+    by_uid = {c.uid: c for c in creatures}
+    flock = iter(arrays['perception_flock'].tolist())
+    patches = arrays['creature/perception_patch'].tolist() if 'creature/perception_patch' in arrays else itertools.repeat(-1)
+    rows = zip(arrays['creature/perception_tick'].tolist(), arrays['creature/perception_targets'].tolist(),
+               arrays['creature/perception_food'].tolist(), patches, arrays['creature/perception_flock_count'].tolist())
+    for creature, (tick, targets, food, patch, flock_count) in zip(creatures, rows):
+        # Flockmates that died since are dropped, as the scheduler itself would
+        flockmates = [by_uid[uid] for uid in itertools.islice(flock, flock_count) if uid in by_uid]
+        if tick < 0: continue
+        # A target that is gone makes the creature perceive afresh, which is what no perception does too
+        if any(uid != -1 and uid not in by_uid for uid in targets) or food < -1: continue
+        if patch >= 0 and vegetation is None: continue
+        perceived = {name: by_uid.get(uid) for name, uid in zip(PERCEPTION_TARGETS, targets)}
+        if food >= 0: perceived['food'] = foods[food]
+        if patch >= 0: perceived['food'] = vegetation.patch(patch)
+        creature.perception = Perception(tick, flockmates, **perceived)
+
+
+def capture_snapshot(sim, base=None):
+    """
+    Copies the simulation state into arrays on the calling thread, so the (slow)
+    compression and disk write can happen elsewhere while the simulation goes on.
+    With a `base`, only what changed since that full snapshot is captured.
+    Returns (arrays, genomes) where `genomes` are all genomes the snapshot refers to.
+    """
+    p = sim.neat_population
+    creatures, foods, n = sim.creatures, sim.foods, len(sim.creatures)
+    # Parked sleepers are saved as of now (they are parked again after the first tick of the loaded run)
+    for c in creatures: sim.sleep.settle(c)
+
+    # Genomes are never modified in place (NEAT breeds new ones), so they
+    # are referenced by index into one list and pickled once per full snapshot
+    genomes = list(base.genomes) if base else list(p.population.values())
+    genome_index = dict(base.genome_index) if base else {id(g): i for i, g in enumerate(genomes)}
+    for c in creatures:
+        if id(c.genome) not in genome_index:
+            genome_index[id(c.genome)] = len(genomes)
+            genomes.append(c.genome)
+
+    archetype_index = {id(CREATURE_ARCHETYPES[key]): i for i, key in enumerate(ARCHETYPE_KEYS)}
+    arrays = {f'creature/{name}': _column((getattr(c, name) for c in creatures), dtype, n)
+              for name, dtype in CREATURE_COLUMNS.items()}
+    arrays.update({
+        'creature/genome': _column((genome_index[id(c.genome)] for c in creatures), np.int32, n),
+        'creature/archetype': _column((archetype_index[id(c.archetype)] for c in creatures), np.int16, n),
+        'creature/state': _column((STATE_CODES[c.state] for c in creatures), np.int8, n),
+        'creature/tribe_color': np.array([c.tribe_color for c in creatures], dtype=np.uint8).reshape(n, 3),
+        'creature/body_size': _column((c.body_size_mod for c in creatures), np.float64, n),
+        'creature/pattern': _column((PATTERN_TYPES.index(c.pattern_type) for c in creatures), np.int8, n),
+        'creature/pattern_color': np.array([c.pattern_color for c in creatures], dtype=np.uint8).reshape(n, 3),
+        # Reused by far-away creatures on the ticks they do not think; NaN while a creature has not thought yet
+        'creature/outputs': np.array([(NO_OUTPUTS if c.outputs is None else c.outputs) for c in creatures], dtype=np.float64).reshape(n, 3),
+        'food/x': _column((f.x for f in foods), np.float64, len(foods)),
+        'food/y': _column((f.y for f in foods), np.float64, len(foods)),
+        'food/energy': _column((f.energy for f in foods), np.float64, len(foods)),
+    })
+    arrays.update(_perception_arrays(creatures, foods))
+    if sim.vegetation is not None: arrays['vegetation'] = sim.vegetation.biomass.copy()
+
+    rng_version, rng_state, rng_gauss = random.getstate()
+    meta = {
+        'version': SNAPSHOT_VERSION, 'kind': 'delta' if base else 'full', 'base': base.name if base else None,
+        'tick': sim.tick, 'generation_timer': sim.generation_timer, 'time_info': sim.time_info,
+        'population_history': sim.population_history.state(), 'generation': p.generation,
+        'random_state': [rng_version, list(rng_state), rng_gauss],
+        # Id counters, so that a resumed run names new genomes, species, nodes and creatures
+        # exactly as the original run did (NEAT matches genes by node id in crossover)
+        'counters': {
+            'genome': _next_value(p.reproduction, 'genome_indexer'), 'species': _next_value(p.species, 'indexer'),
+            'node': _next_value(sim.config.genome_config, 'node_indexer'), 'creature': _next_value(Creature, 'uids'),
+        },
+        # A generation evolving in the background restarts from this on load (the population
+        # itself is only replaced when it finishes, so the one saved here is its input)
+        'evolution': _evolution_job(sim.evolution.job),
+        'focus': sim.focus,
+    }
+    arrays['meta'] = np.array(json.dumps(meta))
+    if base:
+        arrays['genomes'] = _blob({'genomes': genomes[len(base.genomes):]})
+    else:
+        arrays['terrain'] = sim.world.terrain.copy()
+        arrays['genomes'] = _blob({
+            'genomes': genomes, 'population': p.population,
+            'species': p.species.species, 'genome_to_species': p.species.genome_to_species,
+            'ancestors': p.reproduction.ancestors,
+        })
+    return arrays, genomes
+
+
+def write_snapshot(path, arrays):
+    """Writes captured arrays to `path` atomically (readers never see a half-written file)."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def save_snapshot(sim, path):
+    """Synchronously writes a full snapshot of `sim` to `path`."""
+    write_snapshot(path, capture_snapshot(sim)[0])
+
+
+def _read(path):
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(arrays['meta'].item())
+    if meta.get('version') not in READABLE_VERSIONS:
+        raise ValueError(f"Unsupported snapshot version {meta.get('version')} in {path} (expected {SNAPSHOT_VERSION})")
+    return arrays, meta, pickle.loads(arrays['genomes'].tobytes())
+
+
+def load_snapshot(sim, path):
+    """
+    Restores a full or delta snapshot into an existing Simulation, in place. The
+    whole state is read and rebuilt first and only then swapped into `sim`, so a
+    bad or truncated file raises with `sim` left as it was.
+    """
+    arrays, meta, genome_data = _read(path)
+    if meta['kind'] == 'delta':
+        base_arrays, _, base_data = _read(os.path.join(os.path.dirname(path), meta['base']))
+        terrain, genomes = base_arrays['terrain'], base_data['genomes'] + genome_data['genomes']
+        neat_data = base_data
+    else:
+        terrain, genomes, neat_data = arrays['terrain'], genome_data['genomes'], genome_data
+    population, species = neat_data['population'], neat_data['species']
+    genome_to_species, ancestors = neat_data['genome_to_species'], neat_data['ancestors']
+    counters = meta.get('counters', {
+        'genome': max(g.key for g in genomes) + 1, 'species': max(species, default=0) + 1, 'node': None,
+    })
+
+    # --- World and entities ---
+    world = WorldMap(terrain)
+    columns = {name.split('/', 1)[1]: arrays[name].tolist() for name in arrays if name.startswith('creature/')}
+    # Rebuilding creatures draws random numbers and creature ids: both are put back if loading fails
+    random_state, uids = random.getstate(), _next_value(Creature, 'uids')
+    # Only a cache: the loaded creatures fill it again, and no failure needs it back
+    NETWORK_CACHE.clear()
+    try:
+        creatures = []
+        for i in range(len(columns['genome'])):
+            record = {name: columns[name][i] for name in CREATURE_COLUMNS if name in columns}
+            record['state'] = STATE_NAMES[columns['state'][i]]
+            record['tribe_color'] = tuple(columns['tribe_color'][i])
+            if 'outputs' in columns and not math.isnan(columns['outputs'][i][0]): record['outputs'] = columns['outputs'][i]
+            record['body_size_mod'] = columns['body_size'][i]
+            record['pattern_type'] = PATTERN_TYPES[columns['pattern'][i]]
+            record['pattern_color'] = tuple(columns['pattern_color'][i])
+            archetype = CREATURE_ARCHETYPES[ARCHETYPE_KEYS[columns['archetype'][i]]]
+            creatures.append(Creature.from_record(sim, genomes[columns['genome'][i]], archetype, record))
+        foods = []
+        for x, y, energy in zip(arrays['food/x'].tolist(), arrays['food/y'].tolist(), arrays['food/energy'].tolist()):
+            food = Food(sim, (x, y))
+            food.energy = energy
+            foods.append(food)
+        # A snapshot without a grid starts the grid afresh (and one with a grid loads without it when it is off)
+        vegetation = None if sim.vegetation is None else Vegetation(world, arrays.get('vegetation'))
+        if 'perception_flock' in arrays: _restore_perceptions(arrays, creatures, foods, vegetation)
+
+        if isinstance(meta['population_history'], list):
+            history = PopulationHistory(sim.population_history.names)
+            for counts in meta['population_history']: history.append(counts)
+        else:
+            history = PopulationHistory.from_state(meta['population_history'])
+        rng_version, rng_state, rng_gauss = meta['random_state']
+        loaded_random_state = (rng_version, tuple(rng_state), rng_gauss)
+        job = meta.get('evolution')
+        if job: job = {**job, 'fitness': dict((key, fitness) for key, fitness in job['fitness'])}
+        focus = tuple(meta['focus']) if meta.get('focus') else None
+    except Exception:
+        random.setstate(random_state)
+        Creature.uids = itertools.count(uids)
+        raise
+
+    # --- Everything loaded: swap it in ---
+    p = sim.neat_population
+    p.population, p.generation = population, meta['generation']
+    p.species.species, p.species.genome_to_species = species, genome_to_species
+    p.reproduction.ancestors = ancestors
+    p.reproduction.genome_indexer = itertools.count(counters['genome'])
+    p.species.indexer = itertools.count(counters['species'])
+    sim.config.genome_config.node_indexer = None if counters['node'] is None else itertools.count(counters['node'])
+    sim.world, sim.creatures, sim.foods, sim.vegetation = world, creatures, foods, vegetation
+    if 'creature' in counters: Creature.uids = itertools.count(counters['creature'])
+    sim.tick, sim.generation_timer = meta['tick'], meta['generation_timer']
+    sim.sleep.clear(sim.tick)
+    sim.time_info = meta['time_info']
+    sim.focus = focus
+    sim.population_history = history
+    sim.recount()
+    random.setstate(loaded_random_state)
+
+    sim.evolution.cancel()
+    if job: sim.evolution.start(p, job)
+    return sim
+
+
+class SnapshotWriter:
+    """
+    Writes snapshots on a background thread. The state is captured on the caller's
+    thread (cheap: a few arrays and one pickle), then compressed and written while
+    the simulation keeps running. With `every` > 0, `after_tick` writes a checkpoint
+    into `directory` every `every` ticks: a full snapshot first, then cumulative
+    deltas (creatures, food, clocks and new genomes only) until the world or the
+    NEAT generation changes or SNAPSHOT_FULL_EVERY deltas have been written.
+    `last_path` is the last snapshot that made it to disk (None before the first).
+    """
+
+    def __init__(self, directory=None, every=0, full_every=SNAPSHOT_FULL_EVERY):
+        self.directory, self.every, self.full_every = directory, every, full_every
+        self.last_path = None
+        self._base = None
+        self._queue = queue.Queue(maxsize=2)  # back-pressure: never more than two pending writes
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None: break
+            path, arrays = job
+            try:
+                write_snapshot(path, arrays)
+                self.last_path = path
+            except Exception as e:
+                print(f"Error saving snapshot {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def save(self, sim, path):
+        """Queues a full, standalone snapshot of `sim` to `path`."""
+        self._queue.put((path, capture_snapshot(sim)[0]))
+
+    def after_tick(self, sim):
+        if self.every and sim.tick % self.every == 0:
+            self.checkpoint(sim)
+
+    def checkpoint(self, sim):
+        """Queues a full or delta checkpoint of `sim` into the checkpoint directory."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"checkpoint_{sim.tick:09d}.npz"
+        base = self._base
+        if base and base.covers(sim) and base.deltas < self.full_every:
+            arrays, _ = capture_snapshot(sim, base)
+            base.deltas += 1
+        else:
+            arrays, genomes = capture_snapshot(sim)
+            p = sim.neat_population
+            self._base = _Base(name, sim.world, genomes, frozenset(p.population), p.generation)
+        self._queue.put((os.path.join(self.directory, name), arrays))
+
+    def flush(self):
+        """Blocks until every queued snapshot is on disk."""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,84 @@
+import math
+from settings import CELL_SIZE, SPATIAL_BUCKET_CELLS
+
+
+class SpatialHash:
+    """
+    Uniform bucket grid over the world, aligned with the terrain grid.
+    Each bucket covers SPATIAL_BUCKET_CELLS x SPATIAL_BUCKET_CELLS terrain cells and
+    holds (list index, x, y, item) entries, positions as of the last rebuild.
+    Queries return items in the order of the list the hash was built from, so
+    callers relying on `min`/`next` tie-breaking see the same results as a full scan.
+    """
+
+    def __init__(self, bucket_size=CELL_SIZE * SPATIAL_BUCKET_CELLS):
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self._order = {}
+
+    def _key(self, x, y):
+        return int(x // self.bucket_size), int(y // self.bucket_size)
+
+    def rebuild(self, items):
+        """Re-indexes every item from scratch, at its current position."""
+        self.buckets.clear()
+        self._order.clear()
+        for i, item in enumerate(items):
+            x, y = item.x, item.y
+            self.buckets.setdefault(self._key(x, y), []).append((i, x, y, item))
+            self._order[id(item)] = i
+
+    def __contains__(self, item):
+        """Whether `item` was in the list the hash was last built from."""
+        return id(item) in self._order
+
+    def query(self, x, y, radius):
+        """Returns the items strictly closer than `radius` to (x, y), in list order."""
+        size = self.bucket_size
+        min_bx, max_bx = int((x - radius) // size), int((x + radius) // size)
+        min_by, max_by = int((y - radius) // size), int((y + radius) // size)
+        buckets = self.buckets
+        hypot = math.hypot
+        found = []
+        for bx in range(min_bx, max_bx + 1):
+            left, right = bx * size, (bx + 1) * size
+            far_dx = max(abs(x - left), abs(x - right))
+            for by in range(min_by, max_by + 1):
+                bucket = buckets.get((bx, by))
+                if not bucket: continue
+                top, bottom = by * size, (by + 1) * size
+                if hypot(far_dx, max(abs(y - top), abs(y - bottom))) < radius:
+                    # The whole bucket lies inside the circle
+                    found.extend(bucket)
+                    continue
+                for entry in bucket:
+                    if hypot(x - entry[1], y - entry[2]) < radius: found.append(entry)
+        # List indices are unique, so entries sort by them alone
+        if len(found) > 1: found.sort()
+        return [entry[3] for entry in found]
+
+
+class SpatialIndex:
+    """
+    Per-tick neighbor index for creatures and food, shared by every creature.
+    With `by_name`, creatures are also indexed per archetype name (used by the
+    perception scheduler to notice a predator coming into sight cheaply).
+    """
+
+    def __init__(self, by_name=False):
+        self.creatures = SpatialHash()
+        self.foods = SpatialHash()
+        self.track_names = by_name
+        self.by_name = {}
+
+    def rebuild(self, creatures, foods):
+        self.rebuild_creatures(creatures)
+        self.foods.rebuild(foods)
+
+    def rebuild_creatures(self, creatures):
+        self.creatures.rebuild(creatures)
+        if self.track_names:
+            groups = {}
+            for c in creatures: groups.setdefault(c.name, []).append(c)
+            self.by_name = {name: self.by_name.get(name) or SpatialHash() for name in groups}
+            for name, members in groups.items(): self.by_name[name].rebuild(members)
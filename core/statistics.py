@@ -0,0 +1,66 @@
+from collections import deque
+from settings import POPULATION_HISTORY_CAPACITY, POPULATION_HISTORY_LEVELS
+
+
+class PopulationHistory:
+    """
+    Bounded, multi-resolution history of the population counts (one sample per day).
+
+    Level 0 keeps the last `capacity` samples; level k keeps the last `capacity` bins
+    of 2**k samples each, every bin being the mean of two bins of the level below.
+    Memory is at most capacity * levels samples however long the run, and `series()`
+    picks the finest level that still spans the whole run (or the coarsest one).
+    Samples are tuples in `names` order; `version` changes on every append, so
+    views of the history can be cached until it does.
+    """
+
+    def __init__(self, names, capacity=POPULATION_HISTORY_CAPACITY, levels=POPULATION_HISTORY_LEVELS):
+        self.names = list(names)
+        self.capacity = capacity
+        self.levels = [deque(maxlen=capacity) for _ in range(levels)]
+        # Bin of each level above 0 waiting for its second half
+        self.pending = [None] * levels
+        self.count = 0
+        self.version = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, counts):
+        """Adds one sample from a {name: count} dict."""
+        sample = tuple(counts.get(name, 0) for name in self.names)
+        self.levels[0].append(sample)
+        for level in range(1, len(self.levels)):
+            if self.pending[level] is None:
+                self.pending[level] = sample
+                break
+            sample = tuple((a + b) / 2 for a, b in zip(self.pending[level], sample))
+            self.pending[level] = None
+            self.levels[level].append(sample)
+        self.count += 1
+        self.version += 1
+
+    def series(self):
+        """(samples per bin, bins) of the finest level covering the whole run."""
+        for level, bins in enumerate(self.levels):
+            if self.capacity << level >= self.count:
+                return 1 << level, list(bins)
+        return 1 << (len(self.levels) - 1), list(self.levels[-1])
+
+    def as_dicts(self):
+        return [dict(zip(self.names, sample)) for sample in self.series()[1]]
+
+    def state(self):
+        """JSON-serializable state, for snapshots."""
+        return {'names': self.names, 'count': self.count, 'levels': [list(bins) for bins in self.levels],
+                'pending': self.pending}
+
+    @classmethod
+    def from_state(cls, state, capacity=POPULATION_HISTORY_CAPACITY, levels=POPULATION_HISTORY_LEVELS):
+        history = cls(state['names'], capacity, levels)
+        for level, bins in enumerate(state['levels'][:levels]):
+            history.levels[level].extend(tuple(sample) for sample in bins)
+        history.pending = [None if sample is None else tuple(sample) for sample in state['pending'][:levels]]
+        history.pending += [None] * (levels - len(history.pending))
+        history.count = history.version = state['count']
+        return history
@@ -0,0 +1,86 @@
+import numpy as np
+from settings import (CELL_SIZE, VEGETATION_CAPACITY, VEGETATION_GROWTH, VEGETATION_SEASON_GROWTH,
+                      VEGETATION_BITE)
+from core.world_management import TERRAIN_TYPES
+
+# Per-terrain lookup tables, indexed by terrain id (terrains without plants hold none)
+CAPACITY_LUT = np.array([VEGETATION_CAPACITY.get(t, 0.0) for t in TERRAIN_TYPES])
+GROWTH_LUT = np.array([VEGETATION_GROWTH.get(t, 0.0) for t in TERRAIN_TYPES])
+
+
+class Patch:
+    """A grid cell with enough plants for a bite, as sensed by a grazer: its pixel center and flat index."""
+    __slots__ = ('x', 'y', 'cell')
+
+    def __init__(self, x, y, cell):
+        self.x, self.y, self.cell = x, y, cell
+
+
+class Vegetation:
+    """
+    Plants as a field instead of items, for the optional VEGETATION_GRID mode: one
+    biomass value per terrain cell (`biomass[x, y]`, in plants), capped by the
+    terrain's capacity. Regrowth is one vectorized update of the whole grid, grazers
+    find food by looking at the cells around them and eat by taking a bite out of
+    the cell they stand on, so nothing costs more as plants multiply.
+    `version` changes whenever the field grows or is planted, so its overlay can be
+    cached until it does (bites show up at the next growth step).
+    """
+
+    def __init__(self, world, biomass=None):
+        self.width, self.height = world.width, world.height
+        self.capacity = CAPACITY_LUT[world.terrain]
+        self.growth = GROWTH_LUT[world.terrain]
+        self.peak = max(VEGETATION_CAPACITY.values(), default=1.0)
+        self.bite = VEGETATION_BITE
+        # A new world starts half grown
+        self.biomass = self.capacity * 0.5 if biomass is None else np.array(biomass, dtype=np.float64)
+        self.version = 0
+
+    def __contains__(self, patch):
+        """Whether a sensed patch still has a bite left."""
+        return isinstance(patch, Patch) and self.biomass.flat[patch.cell] >= self.bite
+
+    def grow(self, season, ticks=1):
+        """Regrows every cell by `ticks` ticks of growth in `season`."""
+        rate = VEGETATION_SEASON_GROWTH.get(season, 1.0) * ticks
+        np.minimum(self.biomass + self.growth * rate, self.capacity, out=self.biomass)
+        self.version += 1
+
+    def plant(self, x, y):
+        """Fills the cell holding world point (x, y) up to its capacity (god-mode food)."""
+        cell = self._cell(x, y)
+        if cell is None: return
+        self.biomass[cell] = self.capacity[cell]
+        self.version += 1
+
+    def graze(self, x, y):
+        """Takes a bite out of the cell holding world point (x, y); returns the biomass eaten (0 if too little)."""
+        cell = self._cell(x, y)
+        if cell is None or self.biomass[cell] < self.bite: return 0.0
+        self.biomass[cell] -= self.bite
+        return self.bite
+
+    def nearest(self, x, y, radius):
+        """The closest patch with a bite left whose center is within `radius` of (x, y), or None."""
+        grid_x, grid_y, reach = int(x // CELL_SIZE), int(y // CELL_SIZE), int(radius // CELL_SIZE) + 1
+        x0, x1 = max(0, grid_x - reach), min(self.width, grid_x + reach + 1)
+        y0, y1 = max(0, grid_y - reach), min(self.height, grid_y + reach + 1)
+        if x0 >= x1 or y0 >= y1: return None
+        cells_x, cells_y = np.nonzero(self.biomass[x0:x1, y0:y1] >= self.bite)
+        if not len(cells_x): return None
+        centers_x = (cells_x + x0) * CELL_SIZE + CELL_SIZE // 2
+        centers_y = (cells_y + y0) * CELL_SIZE + CELL_SIZE // 2
+        distances = (centers_x - x) ** 2 + (centers_y - y) ** 2
+        i = int(np.argmin(distances))
+        if distances[i] >= radius * radius: return None
+        return self.patch((int(cells_x[i]) + x0) * self.height + int(cells_y[i]) + y0)
+
+    def patch(self, cell):
+        grid_x, grid_y = divmod(cell, self.height)
+        return Patch(grid_x * CELL_SIZE + CELL_SIZE // 2, grid_y * CELL_SIZE + CELL_SIZE // 2, cell)
+
+    def _cell(self, x, y):
+        grid_x, grid_y = int(x // CELL_SIZE), int(y // CELL_SIZE)
+        if not (0 <= grid_x < self.width and 0 <= grid_y < self.height): return None
+        return grid_x, grid_y
@@ -1,46 +1,157 @@
-from perlin_noise import PerlinNoise
+import os
 import random
-from settings import GRID_WIDTH, GRID_HEIGHT, SCALE, OCTAVES, PERSISTENCE, LACUNARITY, TERRAINS, DAY_LENGTH, SEASON_LENGTH
+import hashlib
+import numpy as np
+from settings import (CELL_SIZE, WORLD_WIDTH, WORLD_HEIGHT, SCALE, OCTAVES, PERSISTENCE, LACUNARITY, TERRAINS,
+                      DAY_LENGTH, SEASON_LENGTH, FOOD_SPAWN_TERRAINS, TERRAIN_CACHE_DIR, TERRAIN_CACHE_MAX_FILES,
+                      VEGETATION_GROW_EVERY)
+from core.noise import perlin_grid
 from entities.food import Food
 
-def generate_world(seed):
+# --- Terrain lookup tables, indexed by terrain id ---
+TERRAIN_TYPES = list(TERRAINS)
+TERRAIN_IDS = {terrain_type: i for i, terrain_type in enumerate(TERRAIN_TYPES)}
+ENERGY_COSTS = tuple(TERRAINS[t]["energy_cost"] for t in TERRAIN_TYPES)
+MOVEMENT_COSTS = tuple(TERRAINS[t]["movement_cost"] for t in TERRAIN_TYPES)
+TERRAIN_COLORS = tuple(TERRAINS[t]["color"] for t in TERRAIN_TYPES)
+ENERGY_COST_LUT = np.array(ENERGY_COSTS)
+# The per-cell dicts handed out by the world[x][y] accessor (shared, one per terrain)
+TERRAIN_CELLS = tuple({"type": t, "properties": TERRAINS[t]} for t in TERRAIN_TYPES)
+
+class _WorldColumn:
+    """world[x]: a read-only view of one grid column, so world[x][y] keeps working."""
+    __slots__ = ('_world', '_x')
+    def __init__(self, world, x):
+        self._world, self._x = world, x
+    def __len__(self):
+        return self._world.height
+    def __getitem__(self, y):
+        if not 0 <= y < self._world.height: raise IndexError(y)
+        return TERRAIN_CELLS[self._world.terrain_id(self._x, y)]
+
+class WorldMap:
+    """
+    Compact terrain grid: one uint8 terrain id per cell (`terrain[x, y]`) plus lookup
+    tables for the per-terrain properties. `world[x][y]` still returns the
+    {'type', 'properties'} dict of a cell for older callers.
+    Cells are also indexed by terrain type once, so spawners can pick a valid cell
+    in O(1) instead of scanning the grid or rejection-sampling it.
+    """
+    def __init__(self, terrain):
+        self.terrain = np.ascontiguousarray(terrain, dtype=np.uint8)
+        self.width, self.height = self.terrain.shape
+        self.pixel_width, self.pixel_height = self.width * CELL_SIZE, self.height * CELL_SIZE
+        self._index()
+
+    def _index(self):
+        self._ids = self.terrain.tobytes()  # flat x-major copy for fast scalar lookups
+        flat = self.terrain.ravel()
+        self.cells_by_terrain = {terrain_type: np.flatnonzero(flat == i) for i, terrain_type in enumerate(TERRAIN_TYPES)}
+        self._spawn_cells = {}
+        self._energy_costs = None
+
+    def __getstate__(self):
+        return {'shape': self.terrain.shape, 'terrain': self.terrain.tobytes()}
+
+    def __setstate__(self, state):
+        self.__init__(np.frombuffer(state['terrain'], dtype=np.uint8).reshape(state['shape']))
+
+    # --- world[x][y] compatibility ---
+    def __len__(self):
+        return self.width
+    def __getitem__(self, x):
+        if not 0 <= x < self.width: raise IndexError(x)
+        return _WorldColumn(self, x)
+    def __iter__(self):
+        return (_WorldColumn(self, x) for x in range(self.width))
+
+    # --- Per-cell lookups ---
+    def terrain_id(self, grid_x, grid_y):
+        return self._ids[grid_x * self.height + grid_y]
+    def terrain_type(self, grid_x, grid_y):
+        return TERRAIN_TYPES[self._ids[grid_x * self.height + grid_y]]
+    def movement_cost(self, grid_x, grid_y):
+        return MOVEMENT_COSTS[self._ids[grid_x * self.height + grid_y]]
+    def energy_cost_grid(self):
+        """(width, height) array with the terrain energy cost of every cell (built on first use)."""
+        if self._energy_costs is None: self._energy_costs = ENERGY_COST_LUT[self.terrain]
+        return self._energy_costs
+
+    def spawn_cells(self, terrain_types):
+        """Flat indices (x * height + y) of all cells of the given terrain types, in grid scan order."""
+        key = frozenset(terrain_types)
+        cells = self._spawn_cells.get(key)
+        if cells is None:
+            cells = np.sort(np.concatenate([self.cells_by_terrain[terrain_type] for terrain_type in key]))
+            self._spawn_cells[key] = cells
+        return cells
+
+    def random_spawn_point(self, terrain_types):
+        """Pixel center of a random cell of the given terrain types, or None if there is none."""
+        cells = self.spawn_cells(terrain_types)
+        if not len(cells): return None
+        grid_x, grid_y = divmod(int(cells[random.randrange(len(cells))]), self.height)
+        return (grid_x * CELL_SIZE + CELL_SIZE // 2, grid_y * CELL_SIZE + CELL_SIZE // 2)
+
+# Noise thresholds above which each terrain starts, from lowest to highest
+TERRAIN_THRESHOLDS = (
+    (-0.5, "SHALLOW_WATER"), (-0.3, "BEACH"), (-0.2, "GRASSLAND"),
+    (0.25, "FOREST"), (0.6, "MOUNTAIN"), (0.75, "SNOW"),
+)
+# Bump when the generator changes so stale cached terrain is not reused
+TERRAIN_GENERATOR_VERSION = 1
+
+def _terrain_cache_path(seed, width, height):
+    key = repr((TERRAIN_GENERATOR_VERSION, seed, width, height, SCALE, OCTAVES, PERSISTENCE, LACUNARITY,
+                TERRAIN_TYPES, TERRAIN_THRESHOLDS))
+    return os.path.join(TERRAIN_CACHE_DIR, f"terrain_{hashlib.sha1(key.encode()).hexdigest()[:16]}.npy")
+
+def _prune_terrain_cache(keep=TERRAIN_CACHE_MAX_FILES):
+    """Deletes the least recently used cached terrains so that at most `keep` are left."""
+    paths = [os.path.join(TERRAIN_CACHE_DIR, name) for name in os.listdir(TERRAIN_CACHE_DIR)
+             if name.startswith("terrain_") and name.endswith(".npy")]
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:max(0, len(paths) - keep)]: os.remove(path)
+
+def generate_world(seed, width=WORLD_WIDTH, height=WORLD_HEIGHT, use_cache=True):
     """
     Generates a procedural world map using Perlin noise.
-    The world is a 2D grid where each cell is a dictionary containing terrain info.
+    The world is a width x height grid of terrain ids (see WorldMap). The noise is
+    evaluated for the whole grid at once, and the resulting terrain is cached on
+    disk per seed and noise parameters so repeated runs with a seed start instantly
+    (keeping the TERRAIN_CACHE_MAX_FILES most recently used).
     """
-    world_map = [[{} for _ in range(GRID_HEIGHT)] for _ in range(GRID_WIDTH)]
-    noise = PerlinNoise(octaves=OCTAVES, seed=seed)
-
-    for x in range(GRID_WIDTH):
-        for y in range(GRID_HEIGHT):
-            # Generate a noise value using Perlin noise
-            noise_val = noise([x / SCALE, y / SCALE])
-
-            # Map noise value to terrain type
-            terrain_type = "DEEP_WATER" # Default
-            if noise_val > -0.5:
-                terrain_type = "SHALLOW_WATER"
-            if noise_val > -0.3:
-                terrain_type = "BEACH"
-            if noise_val > -0.2:
-                terrain_type = "GRASSLAND"
-            if noise_val > 0.25:
-                terrain_type = "FOREST"
-            if noise_val > 0.6:
-                terrain_type = "MOUNTAIN"
-            if noise_val > 0.75:
-                terrain_type = "SNOW"
-
-            world_map[x][y] = {
-                "type": terrain_type,
-                "properties": TERRAINS[terrain_type]
-            }
-
-    return world_map
-
-def manage_environment(time_info, foods, world, assets):
+    if not seed:
+        # Same as perlin_noise: a falsy seed means a random one, which is never cached
+        seed, use_cache = random.randint(1, 10**5), False
+    cache_path = _terrain_cache_path(seed, width, height)
+    if use_cache and os.path.exists(cache_path):
+        try:
+            world = WorldMap(np.load(cache_path))
+            os.utime(cache_path)  # Recently used, so pruned last
+            return world
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable terrain cache {cache_path}: {e}")
+
+    noise = perlin_grid(seed, width, height, SCALE, OCTAVES)
+    terrain = np.full((width, height), TERRAIN_IDS["DEEP_WATER"], dtype=np.uint8)  # Default
+    for threshold, terrain_type in TERRAIN_THRESHOLDS:
+        terrain[noise > threshold] = TERRAIN_IDS[terrain_type]
+
+    if use_cache:
+        try:
+            os.makedirs(TERRAIN_CACHE_DIR, exist_ok=True)
+            np.save(cache_path, terrain)
+            _prune_terrain_cache()
+        except OSError as e:
+            print(f"Could not cache terrain to {cache_path}: {e}")
+    return WorldMap(terrain)
+
+def manage_environment(time_info, foods, context):
     """
     Manages the simulation's time, seasons, and dynamic events like food spawning.
+    New food lives in `context` (the Simulation: its world and assets); with a
+    vegetation grid (context.vegetation), the grid regrows instead.
     """
     # 1. Update Time and Seasons
     time_info['world_time'] = (time_info['world_time'] + 1) % DAY_LENGTH
@@ -54,6 +165,10 @@ def manage_environment(time_info, foods, world, assets):
 
     # 2. Spawn Food based on Season
     season = time_info['current_season']
+    vegetation = context.vegetation
+    if vegetation is not None:
+        if time_info['season_timer'] % VEGETATION_GROW_EVERY == 0: vegetation.grow(season, VEGETATION_GROW_EVERY)
+        return time_info
     if season == "Primavera":
         spawn_chance = 0.03
     elif season == "Verão":
@@ -64,16 +179,9 @@ def manage_environment(time_info, foods, world, assets):
         spawn_chance = 0.005
 
     if random.random() < spawn_chance:
-        # Find a valid location to spawn food (not in water or on mountains)
-        valid_spawns = []
-        for x in range(GRID_WIDTH):
-            for y in range(GRID_HEIGHT):
-                terrain_type = world[x][y]['type']
-                if terrain_type in ["GRASSLAND", "FOREST", "BEACH"]:
-                    valid_spawns.append((x * 16 + 8, y * 16 + 8)) # Spawn in center of cell
-
-        if valid_spawns:
-            pos = random.choice(valid_spawns)
-            foods.append(Food(world, assets, pos))
+        # Spawn in the center of a valid cell (not in water or on mountains)
+        pos = context.world.random_spawn_point(FOOD_SPAWN_TERRAINS)
+        if pos:
+            foods.append(Food(context, pos))
 
     return time_info
@@ -59,3 +59,37 @@ CREATURE_ARCHETYPES = {
         'behaviors': {'social_group': 'pack'}
     }
 }
+
+
+class Archetype:
+    """
+    One CREATURE_ARCHETYPES entry flattened into attributes, shared by every creature
+    of that archetype (creatures read their name, diet and base attributes through it
+    instead of each keeping copies). Records are interned: `Archetype.of(spec)`
+    always returns the same record for the same entry.
+    """
+    __slots__ = ('spec', 'name', 'diet', 'prey_archetypes', 'predator_archetypes', 'max_speed', 'vision_radius',
+                 'max_energy', 'energy_per_food', 'reproduction_urge_threshold', 'lifespan', 'nest_sprite_key')
+    _interned = {}
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec['name']
+        self.diet = spec['diet']
+        self.prey_archetypes = spec['prey_archetypes']
+        self.predator_archetypes = spec['predator_archetypes']
+        attrs = spec['base_attributes']
+        self.max_speed = attrs['max_speed']
+        self.vision_radius = attrs['vision_radius']
+        self.max_energy = attrs['max_energy']
+        self.energy_per_food = attrs.get('energy_per_plant', attrs.get('energy_per_kill', 300))
+        self.reproduction_urge_threshold = attrs['reproduction_urge_threshold']
+        self.lifespan = attrs['lifespan']
+        self.nest_sprite_key = spec['nest_sprite_key']
+
+    @classmethod
+    def of(cls, spec):
+        record = cls._interned.get(id(spec))
+        if record is None or record.spec is not spec:
+            record = cls._interned[id(spec)] = cls(spec)
+        return record
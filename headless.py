@@ -0,0 +1,75 @@
+"""
+Runs the simulation without a window, as fast as possible, for long evolutionary
+experiments on machines without a display.
+
+    python headless.py --ticks 20000 --seed 42
+"""
+import os
+import sys
+import time
+import argparse
+
+# Must be set before pygame is first imported: no window is ever opened
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import neat
+
+from core.simulation import Simulation
+from core.snapshot import SnapshotWriter, load_snapshot
+from core.profiling import PROFILER
+from settings import CHECKPOINT_DIR
+
+
+def run_headless(config_file, ticks, seed=None, report_every=1000, checkpoint_every=0,
+                 checkpoint_dir=CHECKPOINT_DIR, resume=None, profile=None, profile_every=1000):
+    """
+    Runs `ticks` simulation ticks and returns the simulation and the measured ticks/sec.
+    With `checkpoint_every`, checkpoints are written in the background to `checkpoint_dir`;
+    `resume` continues from a saved snapshot or checkpoint instead of a new world.
+    With `profile` (a .csv or .json path), per-phase timings are dumped every `profile_every` ticks.
+    """
+    if profile: PROFILER.enabled = True
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation, config_file)
+    sim = Simulation(config, seed=seed)
+    if resume:
+        load_snapshot(sim, resume)
+        print(f"--- Resumed from {resume} at tick {sim.tick} ---")
+    snapshots = SnapshotWriter(checkpoint_dir, checkpoint_every)
+
+    start = last_report = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        sim.step()
+        snapshots.after_tick(sim)
+        PROFILER.end_sample()
+        if profile and tick % profile_every == 0: PROFILER.dump(profile, sim.tick)
+        if report_every and tick % report_every == 0:
+            now = time.perf_counter()
+            print(f"[tick {tick}] {report_every / (now - last_report):.1f} ticks/sec | "
+                  f"creatures: {len(sim.creatures)} | food: {sim.food_amount()} | generation: {sim.neat_population.generation}")
+            last_report = now
+    elapsed = time.perf_counter() - start
+    snapshots.close()
+    ticks_per_sec = ticks / elapsed if elapsed > 0 else float('inf')
+    print(f"--- {ticks} ticks in {elapsed:.2f}s ({ticks_per_sec:.1f} ticks/sec) ---")
+    print(f"Population: {sim.creature_counts()}")
+    if snapshots.last_path: print(f"Last checkpoint: {snapshots.last_path} (continue with --resume)")
+    return sim, ticks_per_sec
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless ecosystem simulation")
+    parser.add_argument("--ticks", type=int, default=10000, help="number of ticks to simulate")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the world and the random generator")
+    parser.add_argument("--report-every", type=int, default=1000, help="print throughput every N ticks (0 disables)")
+    parser.add_argument("--checkpoint-every", type=int, default=0, help="write a checkpoint every N ticks (0 disables)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="where checkpoints are written")
+    parser.add_argument("--resume", default=None, help="snapshot or checkpoint file to continue from")
+    parser.add_argument("--profile", default=None, help="dump per-phase timings to this .csv or .json file")
+    parser.add_argument("--profile-every", type=int, default=1000, help="ticks between profile dumps")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), 'config-feedforward.txt'))
+    args = parser.parse_args()
+    run_headless(args.config, args.ticks, args.seed, args.report_every,
+                 args.checkpoint_every, args.checkpoint_dir, args.resume, args.profile, args.profile_every)
+    sys.exit(0)
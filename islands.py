@@ -0,0 +1,131 @@
+"""
+Runs many independent worlds in parallel, one per seed, in a multiprocessing pool.
+With --migrate-every K the worlds form an island model: every K generations each
+world sends copies of its best genomes to the next world in a ring.
+
+    python islands.py --seeds 1 2 3 4 --generations 5 --migrate-every 2 --out islands.json
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import multiprocessing
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import neat
+
+from settings import SEASON_LENGTH
+
+
+def _fitness_by_key(sim):
+    # Same rule as Simulation.evolve: the last creature carrying a genome sets its fitness
+    return {c.genome.key: c.genome.fitness for c in sim.creatures}
+
+
+def select_migrants(sim, count):
+    """Copies of the `count` fittest genomes currently carried by creatures."""
+    fitness = _fitness_by_key(sim)
+    ranked = sorted((g for g in sim.neat_population.population.values() if g.key in fitness),
+                    key=lambda g: fitness[g.key], reverse=True)
+    migrants = []
+    for genome in ranked[:count]:
+        migrant = copy.deepcopy(genome)
+        migrant.fitness = fitness[genome.key]
+        migrants.append(migrant)
+    return migrants
+
+
+def accept_migrants(sim, migrants):
+    """Replaces the least fit genomes of the population with the migrants and re-speciates."""
+    p = sim.neat_population
+    fitness = _fitness_by_key(sim)
+    worst = sorted(p.population.values(), key=lambda g: fitness.get(g.key, g.fitness or 0))[:len(migrants)]
+    for old, migrant in zip(worst, migrants):
+        del p.population[old.key]
+        migrant.key = next(p.reproduction.genome_indexer)  # keys are only unique within one population
+        p.population[migrant.key] = migrant
+    p.species.speciate(sim.config, p.population, p.generation)
+
+
+def run_island(config_file, seed, generations, migrate_every=0, migrants=2, inbox=None, outbox=None):
+    """Runs one world for `generations` NEAT generations and returns its history."""
+    from core.simulation import Simulation
+
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation, config_file)
+    sim = Simulation(config, seed=seed)
+    reporters = sim.neat_population.reporters.reporters
+    reporters[:] = [r for r in reporters if not isinstance(r, neat.StdOutReporter)]
+    stats = next(r for r in reporters if isinstance(r, neat.StatisticsReporter))
+
+    fitness_history = []
+    start = time.perf_counter()
+    while sim.neat_population.generation < generations:
+        if sim.generation_timer >= SEASON_LENGTH * 2:
+            # The next step evolves: exchange genomes while the current fitness is still known
+            generation = sim.neat_population.generation
+            if migrate_every and outbox is not None and generation % migrate_every == migrate_every - 1:
+                outbox.put(select_migrants(sim, migrants))
+                accept_migrants(sim, inbox.get())
+            sim.step()
+            fitness_history.append({
+                'generation': generation,
+                'best': stats.most_fit_genomes[-1].fitness,
+                'mean': stats.get_fitness_mean()[-1],
+                'population': len(sim.creatures),
+            })
+        else:
+            sim.step()
+
+    return {
+        'seed': seed,
+        'ticks': sim.tick,
+        'elapsed': time.perf_counter() - start,
+        'fitness': fitness_history,
+        'population_history': sim.population_history.as_dicts(),
+    }
+
+
+def run_islands(config_file, seeds, generations, migrate_every=0, migrants=2, processes=None):
+    """Runs one world per seed in a process pool and merges the results into one report."""
+    if migrate_every:
+        # Every island blocks waiting for its neighbour, so all of them must run at once
+        manager = multiprocessing.Manager()
+        queues = [manager.Queue() for _ in seeds]
+        jobs = [(config_file, seed, generations, migrate_every, migrants, queues[i], queues[(i + 1) % len(seeds)])
+                for i, seed in enumerate(seeds)]
+        processes = len(seeds)
+    else:
+        jobs = [(config_file, seed, generations) for seed in seeds]
+
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(run_island, jobs)
+    return {
+        'generations': generations,
+        'migrate_every': migrate_every,
+        'islands': {str(result['seed']): result for result in results},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parallel island runs of the ecosystem")
+    parser.add_argument("--seeds", type=int, nargs='+', default=[1, 2, 3, 4], help="one world per seed")
+    parser.add_argument("--generations", type=int, default=3, help="NEAT generations per world")
+    parser.add_argument("--migrate-every", type=int, default=0, help="migrate genomes every K generations (0 disables)")
+    parser.add_argument("--migrants", type=int, default=2, help="genomes sent per migration")
+    parser.add_argument("--processes", type=int, default=None, help="pool size (defaults to the CPU count)")
+    parser.add_argument("--out", default="islands_report.json", help="where to write the merged report")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), 'config-feedforward.txt'))
+    args = parser.parse_args()
+
+    report = run_islands(args.config, args.seeds, args.generations, args.migrate_every, args.migrants, args.processes)
+    with open(args.out, 'w') as f: json.dump(report, f, indent=2)
+    for seed, island in report['islands'].items():
+        best = max((g['best'] for g in island['fitness']), default=0)
+        print(f"Seed {seed}: {island['ticks']} ticks in {island['elapsed']:.1f}s | best fitness {best}")
+    print(f"--- Report written to {args.out} ---")
+    sys.exit(0)
@@ -2,57 +2,35 @@ import pygame
 import sys
 import os
 import neat
-import random
 import math
-import pickle
+import argparse
 
 from settings import *
-from entities.archetypes import CREATURE_ARCHETYPES
-from entities.creature import Creature
-from entities.food import Food
-from core.world_management import generate_world, manage_environment
-from rendering.assets import generate_visual_assets
-from rendering.drawing import (draw_world, draw_time_overlay, draw_inspector_panel,
-                               draw_main_ui, draw_god_mode_ui, draw_statistics_panel, draw_creature)
-
-SAVE_FILE = "simulation_save.pkl"
-
-def save_simulation(world, creatures, foods, time_info, neat_pop, history):
-    state = {
-        'world': world, 'creatures': creatures, 'foods': foods, 'time_info': time_info,
-        'neat_population': neat_pop.population, 'neat_species': neat_pop.species,
-        'neat_generation': neat_pop.generation, 'random_state': random.getstate(),
-        'population_history': history,
-    }
-    try:
-        with open(SAVE_FILE, 'wb') as f: pickle.dump(state, f)
-        print(f"--- Simulation state saved to {SAVE_FILE} ---")
-    except Exception as e: print(f"Error saving simulation: {e}")
-
-def load_simulation():
-    try:
-        with open(SAVE_FILE, 'rb') as f: state = pickle.load(f)
-        print(f"--- Simulation state loaded from {SAVE_FILE} ---")
-        return state
-    except FileNotFoundError:
-        print(f"Save file not found: {SAVE_FILE}"); return None
-    except Exception as e:
-        print(f"Error loading simulation: {e}"); return None
-
-def run(config_file):
+from core.simulation import Simulation
+from core.scheduler import TickScheduler
+from core.snapshot import SnapshotWriter, load_snapshot
+from core.replay import ReplayRecorder, Replay, new_recording_dir
+from core.profiling import PROFILER
+from rendering.camera import Camera
+from rendering.drawing import (draw_world, draw_time_overlay, draw_inspector_panel, draw_main_ui, draw_god_mode_ui,
+                               draw_statistics_panel, draw_replay_ui, draw_profiler_panel, draw_creature,
+                               creature_rect, draw_vegetation, DirtyRects)
+
+SAVE_FILE = os.path.join(PROJECT_DIR, "simulation_save.npz")
+
+def run(config_file, replay_dir=None):
+    """Runs the interactive simulation, or plays back the recording in `replay_dir`."""
     # --- State Variables ---
-    is_paused = False
-    simulation_speed = 1
+    scheduler = TickScheduler()
     current_tool = None
     selected_creature = None
+    following = False
     show_stats_panel = False
+    show_profiler_panel = PROFILER.enabled
 
     # --- NEAT Setup ---
     config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
                          neat.DefaultSpeciesSet, neat.DefaultStagnation, config_file)
-    p = neat.Population(config)
-    p.add_reporter(neat.StdOutReporter(True))
-    p.add_reporter(neat.StatisticsReporter())
 
     # --- Pygame Init ---
     pygame.init()
@@ -60,141 +38,150 @@ def run(config_file):
     pygame.display.set_caption("Simulador de Ecossistema Digital")
     clock = pygame.time.Clock()
 
-    assets = generate_visual_assets()
-    world = generate_world(random.randint(0, 1000))
-
-    # --- Initial Population ---
-    creatures = []
-    initial_genomes = list(p.population.values())
-    archetype_list = list(CREATURE_ARCHETYPES.keys())
-    for i, genome in enumerate(initial_genomes):
-        genome.fitness = 0
-        tribe_id = i % NUMBER_OF_TRIBES_PER_SPECIES
-        tribe_color = TRIBE_COLORS[tribe_id]
-        archetype_name = archetype_list[i % len(archetype_list)]
-        archetype = CREATURE_ARCHETYPES[archetype_name]
-        creatures.append(Creature(world, assets, genome, config, archetype, tribe_id, tribe_color))
-
-    foods = [Food(world, assets) for _ in range(150)]
-    time_info = {'world_time': 0, 'season_timer': 0, 'current_season': "Primavera"}
-    generation_timer = 0
-    population_history = []
+    sim = Simulation(config, background_evolution=BACKGROUND_EVOLUTION)
+    camera = Camera()
+    dirty_rects = DirtyRects() if DIRTY_RECT_RENDERING else None
+    snapshots = SnapshotWriter(CHECKPOINT_DIR, CHECKPOINT_EVERY)
+    replay, recorder = None, None
+    if replay_dir:
+        replay = Replay(sim, replay_dir)
+        replay.seek(replay.start_tick)
+    elif REPLAY_RECORDING:
+        recorder = ReplayRecorder(new_recording_dir(REPLAY_DIR))
+        recorder.start(sim)
+
+    def tick():
+        if replay:
+            if sim.tick < replay.end_tick: replay.step()
+            else: scheduler.paused = True
+            return
+        sim.step()
+        snapshots.after_tick(sim)
+        if recorder: recorder.after_tick(sim)
+
+    def seek(target):
+        nonlocal selected_creature, following
+        replay.seek(target)
+        scheduler.paused = False  # playback pauses itself at the end of the recording
+        selected_creature, following = None, False
+        camera.clamp(sim.world)
+        if dirty_rects: dirty_rects.invalidate()
 
     # --- Main Loop ---
     running = True
     while running:
         # --- Event Handling ---
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p: is_paused = not is_paused
-                if event.key == pygame.K_g: show_stats_panel = not show_stats_panel
-                if event.key == pygame.K_F5: save_simulation(world, creatures, foods, time_info, p, population_history)
-                if event.key == pygame.K_F9:
-                    state = load_simulation()
-                    if state:
-                        world, creatures, foods, time_info, population_history = state['world'], state['creatures'], state['foods'], state['time_info'], state.get('population_history', [])
-                        p.population, p.species, p.generation = state['neat_population'], state['neat_species'], state['neat_generation']
-                        random.setstate(state['random_state'])
-                        for c in creatures: c.net = neat.nn.FeedForwardNetwork.create(c.genome, config)
-                        print("--- Simulation state fully restored. ---")
-
-                if event.key == pygame.K_RIGHT: simulation_speed = min(5, simulation_speed + 1)
-                if event.key == pygame.K_LEFT: simulation_speed = max(1, simulation_speed - 1)
-                if event.key == pygame.K_f: current_tool = "spawn_food"
-                if event.key == pygame.K_h: current_tool = "spawn_herbivore"
-                if event.key == pygame.K_c: current_tool = "spawn_carnivore"
-                if event.key == pygame.K_j: current_tool = "spawn_human"
-                if event.key == pygame.K_k: current_tool = "spawn_feline"
-                if event.key == pygame.K_x: current_tool = "smite"
-                if event.key == pygame.K_ESCAPE: current_tool = None; selected_creature = None
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if event.button == 3: current_tool = None
-                elif current_tool:
-                    genome = random.choice(list(p.population.values()))
-                    tribe_id = random.randint(0, NUMBER_OF_TRIBES_PER_SPECIES - 1)
-                    tribe_color = TRIBE_COLORS[tribe_id]
-
-                    archetype_map = {
-                        "spawn_herbivore": "herbivore_generic",
-                        "spawn_carnivore": "carnivore_generic",
-                        "spawn_human": "human",
-                        "spawn_feline": "feline"
-                    }
-                    if current_tool == "spawn_food": foods.append(Food(world, assets, pos))
-                    elif current_tool in archetype_map:
-                        archetype = CREATURE_ARCHETYPES[archetype_map[current_tool]]
-                        creatures.append(Creature(world, assets, genome, config, archetype, tribe_id, tribe_color, nest_pos=pos))
-                    elif current_tool == "smite":
-                        for c in creatures[:]:
-                            if math.hypot(pos[0]-c.x, pos[1]-c.y) < CELL_SIZE:
-                                creatures.remove(c)
-                elif creatures:
-                    selected_creature = min(creatures, key=lambda c: math.hypot(pos[0]-c.x, pos[1]-c.y), default=None)
+        with PROFILER.phase('events'):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: running = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_p: scheduler.paused = not scheduler.paused
+                    if event.key == pygame.K_g: show_stats_panel = not show_stats_panel
+                    if event.key == pygame.K_v: following = not following and selected_creature is not None
+                    if event.key == pygame.K_F3:
+                        show_profiler_panel = PROFILER.enabled = not show_profiler_panel
+                        PROFILER.reset()
+                    if event.key == pygame.K_F5:
+                        snapshots.save(sim, SAVE_FILE)
+                        print(f"--- Saving simulation state to {SAVE_FILE} ---")
+                    if event.key == pygame.K_F9 and not replay:
+                        snapshots.flush()
+                        # The loaded state starts a new timeline, so it gets its own recording;
+                        # the current one ends at the last tick it recorded
+                        if recorder: recorder.close(sim)
+                        try:
+                            load_snapshot(sim, SAVE_FILE)
+                            selected_creature, following = None, False
+                            camera.clamp(sim.world)
+                            if dirty_rects: dirty_rects.invalidate()
+                            print(f"--- Simulation state loaded from {SAVE_FILE} ---")
+                        except FileNotFoundError: print(f"Save file not found: {SAVE_FILE}")
+                        except Exception as e: print(f"Error loading simulation: {e}")
+                        if recorder:
+                            recorder = ReplayRecorder(new_recording_dir(REPLAY_DIR))
+                            recorder.start(sim)
+
+                    if event.key == pygame.K_RIGHT: scheduler.faster()
+                    if event.key == pygame.K_LEFT: scheduler.slower()
+                    if event.key == pygame.K_f: current_tool = "spawn_food"
+                    if event.key == pygame.K_h: current_tool = "spawn_herbivore"
+                    if event.key == pygame.K_c: current_tool = "spawn_carnivore"
+                    if event.key == pygame.K_j: current_tool = "spawn_human"
+                    if event.key == pygame.K_k: current_tool = "spawn_feline"
+                    if event.key == pygame.K_x: current_tool = "smite"
+                    if event.key == pygame.K_ESCAPE: current_tool = None; selected_creature = None; following = False
+                    if replay:
+                        if event.key == pygame.K_LEFTBRACKET: seek(sim.tick - REPLAY_SEEK_STEP)
+                        if event.key == pygame.K_RIGHTBRACKET: seek(sim.tick + REPLAY_SEEK_STEP)
+                        if event.key == pygame.K_HOME: seek(replay.start_tick)
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    pos = camera.to_world(pygame.mouse.get_pos())
+                    if event.button == 3: current_tool = None
+                    elif current_tool and not replay: sim.apply_tool(current_tool, pos)
+                    elif sim.creatures:
+                        selected_creature = min(sim.creatures, key=lambda c: math.hypot(pos[0]-c.x, pos[1]-c.y), default=None)
+
+            # --- Camera (WASD) ---
+            keys = pygame.key.get_pressed()
+            pan = CAMERA_PAN_SPEED * clock.get_time() / 1000
+            dx, dy = (keys[pygame.K_d] - keys[pygame.K_a]) * pan, (keys[pygame.K_s] - keys[pygame.K_w]) * pan
+            if dx or dy:
+                following = False
+                if camera.pan(dx, dy, sim.world) and dirty_rects: dirty_rects.invalidate()
+            elif following and selected_creature:
+                if camera.center_on(selected_creature.x, selected_creature.y, sim.world) and dirty_rects: dirty_rects.invalidate()
+            # A replay follows the focus it recorded, wherever its camera is
+            if not replay: sim.focus_on(*camera.center)
 
         # --- Update Logic & Interactions ---
-        if not is_paused:
-            for _ in range(simulation_speed):
-                time_info = manage_environment(time_info, foods, world, assets)
-                generation_timer += 1
-                new_creatures = []
-
-                for creature in creatures: creature.update(creatures, foods, time_info)
-
-                for creature in creatures[:]:
-                    if creature.is_dead(): creatures.remove(creature); continue
-                    if creature.diet['plants']:
-                        for food in foods[:]:
-                            if math.hypot(creature.x - food.x, creature.y - food.y) < CELL_SIZE:
-                                creature.energy = min(creature.max_energy, creature.energy + creature.energy_per_food); foods.remove(food); creature.genome.fitness += 5; break
-                    if creature.diet['meat']:
-                        for prey in creatures[:]:
-                            if creature != prey and prey.name in creature.prey_archetypes and math.hypot(creature.x - prey.x, creature.y - prey.y) < CELL_SIZE:
-                                creature.energy = min(creature.max_energy, creature.energy + creature.energy_per_food); creatures.remove(prey); creature.genome.fitness += 25; break
-                    if creature.reproduction_urge > 1.0:
-                        for partner in creatures:
-                            if creature != partner and creature.name == partner.name and partner.reproduction_urge > 1.0 and math.hypot(creature.x - partner.x, creature.y - partner.y) < CELL_SIZE:
-                                new_creatures.append(creature.reproduce(partner, config)); creature.genome.fitness += 20; partner.genome.fitness += 20; break
-
-                creatures.extend(new_creatures)
-                for c in creatures: c.genome.fitness = c.age
-
-                if time_info['world_time'] == 0:
-                    counts = {archetype['name']: 0 for archetype in CREATURE_ARCHETYPES.values()}
-                    for c in creatures:
-                        if c.name in counts:
-                            counts[c.name] += 1
-                    population_history.append(counts)
-
-                if generation_timer > SEASON_LENGTH * 2:
-                    print("\n--- EVOLVING BRAINS ---")
-                    p.run(lambda genomes, cfg: [setattr(g, 'fitness', c.genome.fitness) for _, c in enumerate(creatures) for g_id, g in genomes if c.genome.key == g_id], 1)
-                    genomes = list(p.population.values());
-                    for c in creatures: c.genome = random.choice(genomes); c.net = neat.nn.FeedForwardNetwork.create(c.genome, config)
-                    generation_timer = 0
-
-        # --- Drawing ---
-        draw_world(screen, world, assets['terrain'])
-        draw_time_overlay(screen, time_info['world_time'])
-        for f in foods: f.draw(screen)
-        for c in creatures:
-            draw_creature(screen, c, c == selected_creature)
-
-        creature_counts = {archetype['name']: len([c for c in creatures if c.name == archetype['name']]) for archetype in CREATURE_ARCHETYPES.values()}
-
-        draw_main_ui(screen, time_info, creature_counts, simulation_speed)
-        draw_inspector_panel(screen, selected_creature)
-        draw_god_mode_ui(screen, current_tool)
-        if show_stats_panel: draw_statistics_panel(screen, population_history)
-
-        pygame.display.flip()
-        clock.tick(60)
-
+        with PROFILER.phase('simulation'):
+            scheduler.advance(tick)
+
+        # --- Drawing (at its own rate, lower while fast-forwarding) ---
+        if scheduler.render_due():
+            with PROFILER.phase('draw.world'):
+                if dirty_rects:
+                    dirty_rects.draw_background(screen, sim.world, sim.assets['terrain'], sim.time_info['world_time'], camera, sim.vegetation)
+                else:
+                    draw_world(screen, sim.world, sim.assets['terrain'], camera=camera)
+                    if sim.vegetation is not None: draw_vegetation(screen, sim.vegetation, camera=camera)
+                    draw_time_overlay(screen, sim.time_info['world_time'])
+            with PROFILER.phase('draw.entities'):
+                visible_foods = [f for f in sim.foods if camera.visible(f.x, f.y)]
+                visible_creatures = [c for c in sim.creatures if camera.visible(c.x, c.y)]
+                food_rects = [f.draw(screen, camera.offset) for f in visible_foods]
+                for c in visible_creatures:
+                    draw_creature(screen, c, c == selected_creature, camera.offset)
+
+            with PROFILER.phase('draw.ui'):
+                if selected_creature: sim.sleep.settle(selected_creature)
+                panels = [draw_main_ui(screen, sim.time_info, sim.creature_counts(), scheduler.label),
+                          draw_inspector_panel(screen, selected_creature),
+                          draw_replay_ui(screen, sim.tick, replay) if replay else draw_god_mode_ui(screen, current_tool)]
+                if show_stats_panel: panels.append(draw_statistics_panel(screen, sim.population_history))
+                if show_profiler_panel: panels.append(draw_profiler_panel(screen, PROFILER.summary()))
+
+            with PROFILER.phase('draw.present'):
+                if dirty_rects:
+                    rects = (food_rects
+                             + [creature_rect(c, c == selected_creature, camera.offset) for c in visible_creatures])
+                    dirty_rects.present(rects + [rect for rect in panels if rect])
+                else:
+                    pygame.display.flip()
+
+        PROFILER.end_sample()
+        clock.tick(RENDER_FPS)
+
+    snapshots.close()
+    if recorder: recorder.close(sim)
+    sim.evolution.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
     local_dir = os.path.dirname(__file__)
-    config_path = os.path.join(local_dir, 'config-feedforward.txt')
-    run(config_path)
+    parser = argparse.ArgumentParser(description="Digital ecosystem simulator")
+    parser.add_argument("--replay", default=None, help="recording directory to play back instead of a new run")
+    parser.add_argument("--config", default=os.path.join(local_dir, 'config-feedforward.txt'))
+    args = parser.parse_args()
+    run(args.config, args.replay)
@@ -0,0 +1,49 @@
+from settings import SCREEN_WIDTH, SCREEN_HEIGHT, CELL_SIZE
+
+
+class Camera:
+    """
+    Viewport onto a world that may be larger than the screen: the screen shows the
+    world pixels from (x, y) to (x + width, y + height). Drawing functions take its
+    `offset` to go from world to screen coordinates, and `to_world` maps mouse
+    positions back.
+    """
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.width, self.height = width, height
+        self.x = self.y = 0
+
+    @property
+    def offset(self):
+        return -self.x, -self.y
+
+    @property
+    def center(self):
+        return self.x + self.width / 2, self.y + self.height / 2
+
+    def clamp(self, world_map):
+        """Keeps the view inside the world (pinned to the top-left if the world is smaller)."""
+        self.x = max(0, min(self.x, world_map.pixel_width - self.width))
+        self.y = max(0, min(self.y, world_map.pixel_height - self.height))
+
+    def pan(self, dx, dy, world_map):
+        """Moves the view by (dx, dy) pixels; returns whether it actually moved."""
+        old = self.x, self.y
+        self.x, self.y = int(self.x + dx), int(self.y + dy)
+        self.clamp(world_map)
+        return (self.x, self.y) != old
+
+    def center_on(self, x, y, world_map):
+        """Centers the view on world point (x, y) as far as the world allows; returns whether it moved."""
+        old = self.x, self.y
+        self.x, self.y = int(x - self.width / 2), int(y - self.height / 2)
+        self.clamp(world_map)
+        return (self.x, self.y) != old
+
+    def to_world(self, pos):
+        return pos[0] + self.x, pos[1] + self.y
+
+    def visible(self, x, y, margin=CELL_SIZE * 2):
+        """Whether something drawn around world point (x, y) can reach the screen."""
+        return (self.x - margin <= x < self.x + self.width + margin
+                and self.y - margin <= y < self.y + self.height + margin)
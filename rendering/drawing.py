@@ -1,51 +1,55 @@
 import pygame
 import math
-from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, CELL_SIZE, FONT_SMALL, FONT_MEDIUM,
-                      DAY_LENGTH, SEASON_LENGTH)
+import weakref
+from collections import OrderedDict
+from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, CELL_SIZE, DAY_LENGTH, NIGHT_OVERLAY_ALPHA_STEP,
+                      CHUNK_CELLS, TERRAIN_CHUNK_CACHE_SIZE,
+                      SPRITE_CACHE_SIZE, SPRITE_ANGLE_STEPS, SPRITE_SIZE_STEP, SPRITE_COLOR_STEP)
 from entities.creature import Creature # Import Creature for type hinting and access
 
-def draw_creature(screen, creature: Creature, is_selected: bool):
-    """Draws a single creature procedurally with unique DNA and animations."""
+# --- Fonts (only loaded by the windowed front-end; headless runs never import this module) ---
+pygame.font.init()
+FONT_SMALL = pygame.font.Font(None, 24)
+FONT_MEDIUM = pygame.font.Font(None, 32)
 
-    # --- 1. Setup and DNA unpacking ---
-    dna = creature.visual_dna
-    body_size = dna['body_size_mod']
-    pattern = dna['pattern_type']
-    pattern_color = dna['pattern_color']
+# Rotated creature sprites, built on first use and evicted least-recently-used
+_sprite_cache = OrderedDict()
+
+def _sprite_key(creature):
+    """Quantized look of a creature: nearby sizes, colours and angles share one cached sprite."""
+    size_bucket = round(creature.body_size_mod / SPRITE_SIZE_STEP)
+    pattern_color = tuple(c - c % SPRITE_COLOR_STEP for c in creature.pattern_color)
+    angle_bucket = round(creature.angle / (2 * math.pi) * SPRITE_ANGLE_STEPS) % SPRITE_ANGLE_STEPS
+    return creature.tribe_color, creature.pattern_type, pattern_color, size_bucket, angle_bucket
+
+def _build_sprite(tribe_color, pattern, pattern_color, size_bucket, angle_bucket):
+    """Draws a creature procedurally from its (quantized) DNA and rotates it."""
+    body_size = size_bucket * SPRITE_SIZE_STEP
 
     # Create a temporary surface for the creature sprite to handle rotation
     sprite_surface = pygame.Surface((CELL_SIZE * 2, CELL_SIZE * 2), pygame.SRCALPHA)
     center = CELL_SIZE # Center of the larger surface
 
-    # --- 2. Animation Logic ---
-    is_moving = creature.state == 'exploring' or creature.state == 'going_to_sleep'
-    creature.animation_timer += 1
-
-    # Walk animation
-    leg_angle = 0
-    if is_moving:
-        leg_angle = math.sin(creature.animation_timer * 0.5) * 30 # Swing angle of 30 degrees
-
-    # --- 3. Draw Body Parts ---
+    # --- Draw Body Parts ---
     # Legs (drawn first to be behind the body)
     leg_length = 6 * body_size
     leg_pos1 = (center + math.cos(math.radians(225)) * leg_length, center + math.sin(math.radians(225)) * leg_length)
     leg_pos2 = (center + math.cos(math.radians(315)) * leg_length, center + math.sin(math.radians(315)) * leg_length)
-    pygame.draw.line(sprite_surface, creature.tribe_color, (center, center), leg_pos1, 2)
-    pygame.draw.line(sprite_surface, creature.tribe_color, (center, center), leg_pos2, 2)
+    pygame.draw.line(sprite_surface, tribe_color, (center, center), leg_pos1, 2)
+    pygame.draw.line(sprite_surface, tribe_color, (center, center), leg_pos2, 2)
 
     # Body
     body_width = 6 * body_size
     body_height = 10 * body_size
     body_rect = pygame.Rect(center - body_width/2, center - body_height/3, body_width, body_height)
-    pygame.draw.ellipse(sprite_surface, creature.tribe_color, body_rect)
+    pygame.draw.ellipse(sprite_surface, tribe_color, body_rect)
 
     # Head
     head_radius = 3 * body_size
     head_pos = (center, center - body_height/2)
-    pygame.draw.circle(sprite_surface, tuple(min(255, c+30) for c in creature.tribe_color), head_pos, head_radius)
+    pygame.draw.circle(sprite_surface, tuple(min(255, c+30) for c in tribe_color), head_pos, head_radius)
 
-    # --- 4. Draw Patterns ---
+    # --- Draw Patterns ---
     if pattern == 'spots':
         for i in range(3):
             spot_x = center + (i-1) * (body_width/3)
@@ -56,36 +60,137 @@ def draw_creature(screen, creature: Creature, is_selected: bool):
             y_pos = center - body_height/4 + (i * body_height/6)
             pygame.draw.line(sprite_surface, pattern_color, (center - body_width/3, y_pos), (center + body_width/3, y_pos), 1)
 
-    # --- 5. Rotation and Blitting ---
-    rotated_sprite = pygame.transform.rotate(sprite_surface, -math.degrees(creature.angle) + 90)
-    rect = rotated_sprite.get_rect(center=(int(creature.x), int(creature.y)))
+    # --- Rotation ---
+    angle = angle_bucket * 2 * math.pi / SPRITE_ANGLE_STEPS
+    return pygame.transform.rotate(sprite_surface, -math.degrees(angle) + 90)
+
+def creature_sprite(creature):
+    """Returns the cached rotated sprite for a creature, building it on a miss."""
+    key = _sprite_key(creature)
+    sprite = _sprite_cache.get(key)
+    if sprite is None:
+        sprite = _sprite_cache[key] = _build_sprite(*key)
+        if len(_sprite_cache) > SPRITE_CACHE_SIZE: _sprite_cache.popitem(last=False)
+    else:
+        _sprite_cache.move_to_end(key)
+    return sprite
+
+def draw_creature(screen, creature: Creature, is_selected: bool, offset=(0, 0)):
+    """Draws a single creature with its cached sprite, plus its selection details (`offset`: world to screen)."""
+    # The sprite has no animated parts (the legs never moved), so no frame goes into its cache key
+    rotated_sprite = creature_sprite(creature)
+    ox, oy = offset
+    x, y = creature.x + ox, creature.y + oy
+    rect = rotated_sprite.get_rect(center=(int(creature.x) + ox, int(creature.y) + oy))
 
     # Draw shadow and final sprite
-    shadow_rect = creature.assets['shadow'].get_rect(center=(int(creature.x+2), int(creature.y+2)))
-    screen.blit(creature.assets['shadow'], shadow_rect)
+    shadow = creature.context.assets['shadow']
+    shadow_rect = shadow.get_rect(center=(int(creature.x+2) + ox, int(creature.y+2) + oy))
+    screen.blit(shadow, shadow_rect)
     screen.blit(rotated_sprite, rect)
 
     # --- 6. Draw UI selection details ---
     if is_selected:
-        pygame.draw.circle(screen, creature.tribe_color, (int(creature.x), int(creature.y)), creature.vision_radius, 1)
-        pygame.draw.line(screen, (255, 255, 255, 100), (creature.x, creature.y), (creature.nest_x, creature.nest_y), 1)
+        pygame.draw.circle(screen, creature.tribe_color, (int(creature.x) + ox, int(creature.y) + oy), creature.vision_radius, 1)
+        pygame.draw.line(screen, (255, 255, 255, 100), (x, y), (creature.nest_x + ox, creature.nest_y + oy), 1)
         if creature.target:
-            target_x = creature.target.x if hasattr(creature.target, 'x') else creature.target['x']
-            target_y = creature.target.y if hasattr(creature.target, 'y') else creature.target['y']
-            pygame.draw.line(screen, (255, 0, 0, 150), (creature.x, creature.y), (target_x, target_y), 2)
+            target_x, target_y = _target_pos(creature)
+            pygame.draw.line(screen, (255, 0, 0, 150), (x, y), (target_x + ox, target_y + oy), 2)
+
+def _target_pos(creature):
+    target = creature.target
+    target_x = target.x if hasattr(target, 'x') else target['x']
+    target_y = target.y if hasattr(target, 'y') else target['y']
+    return target_x, target_y
+
+def creature_rect(creature, is_selected, offset=(0, 0)):
+    """Screen area touched by draw_creature (sprite, shadow and selection details)."""
+    # The rotated 2x2-cell sprite fits in a 3x3-cell box, which also covers the offset shadow
+    rect = pygame.Rect(0, 0, CELL_SIZE * 3, CELL_SIZE * 3)
+    rect.center = (int(creature.x), int(creature.y))
+    if is_selected:
+        radius = creature.vision_radius + 1
+        rect.union_ip(pygame.Rect(int(creature.x) - radius, int(creature.y) - radius, radius * 2, radius * 2))
+        points = [(creature.nest_x, creature.nest_y)] + ([_target_pos(creature)] if creature.target else [])
+        for px, py in points:
+            rect.union_ip(pygame.Rect(int(px) - 2, int(py) - 2, 4, 4))
+    return rect.move(offset)
 
 
 # --- (Other drawing functions remain the same) ---
-def draw_world(screen, world_data, terrain_assets):
-    """Draws the world terrain onto the screen."""
-    for x in range(len(world_data)):
-        for y in range(len(world_data[x])):
-            terrain_type = world_data[x][y]['type']
-            asset = terrain_assets[terrain_type]
-            screen.blit(asset, (x * CELL_SIZE, y * CELL_SIZE))
-
-def draw_time_overlay(screen, world_time):
-    """Draws a transparent overlay to simulate day and night."""
+# Terrain never changes after generation, so each world is drawn once, in CHUNK_CELLS-sided
+# chunks baked the first time they are visible (a large world is never drawn whole)
+_terrain_chunks = weakref.WeakKeyDictionary()
+# Night overlays, one per (quantized) alpha level, built the first time that level is needed
+_night_overlays = {}
+CHUNK_SIZE = CHUNK_CELLS * CELL_SIZE
+
+def terrain_chunk(world_data, terrain_assets, chunk_x, chunk_y):
+    """Returns the surface of one terrain chunk, baking it on a miss (least-recently-used chunks are evicted)."""
+    chunks = _terrain_chunks.get(world_data)
+    if chunks is None: chunks = _terrain_chunks[world_data] = OrderedDict()
+    chunk = chunks.get((chunk_x, chunk_y))
+    if chunk is not None:
+        chunks.move_to_end((chunk_x, chunk_y))
+        return chunk
+    chunk = chunks[(chunk_x, chunk_y)] = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE))
+    first_x, first_y = chunk_x * CHUNK_CELLS, chunk_y * CHUNK_CELLS
+    for x in range(first_x, min(world_data.width, first_x + CHUNK_CELLS)):
+        for y in range(first_y, min(world_data.height, first_y + CHUNK_CELLS)):
+            asset = terrain_assets[world_data.terrain_type(x, y)]
+            chunk.blit(asset, ((x - first_x) * CELL_SIZE, (y - first_y) * CELL_SIZE))
+    if len(chunks) > TERRAIN_CHUNK_CACHE_SIZE: chunks.popitem(last=False)
+    return chunk
+
+def draw_world(screen, world_data, terrain_assets, area=None, camera=None):
+    """Draws the visible world terrain onto the screen (only `area` of the screen, if given)."""
+    area = screen.get_rect() if area is None else screen.get_rect().clip(area)
+    cam_x, cam_y = (camera.x, camera.y) if camera else (0, 0)
+    world_rect = pygame.Rect(-cam_x, -cam_y, world_data.pixel_width, world_data.pixel_height)
+    if not world_rect.contains(area): screen.fill((0, 0, 0), area)
+    left, top = (area.left + cam_x) // CHUNK_SIZE, (area.top + cam_y) // CHUNK_SIZE
+    right, bottom = (area.right - 1 + cam_x) // CHUNK_SIZE, (area.bottom - 1 + cam_y) // CHUNK_SIZE
+    for chunk_x in range(max(0, left), min(right, (world_data.width - 1) // CHUNK_CELLS) + 1):
+        for chunk_y in range(max(0, top), min(bottom, (world_data.height - 1) // CHUNK_CELLS) + 1):
+            chunk_rect = pygame.Rect(chunk_x * CHUNK_SIZE - cam_x, chunk_y * CHUNK_SIZE - cam_y, CHUNK_SIZE, CHUNK_SIZE)
+            part = area.clip(chunk_rect).clip(world_rect)
+            screen.blit(terrain_chunk(world_data, terrain_assets, chunk_x, chunk_y), part,
+                        part.move(-chunk_rect.x, -chunk_rect.y))
+
+# Vegetation overlays: per grid, its version and one pixel per cell, plus the last view scaled up to the screen
+_vegetation_overlays = weakref.WeakKeyDictionary()
+VEGETATION_COLOR = (20, 90, 10)
+VEGETATION_MAX_ALPHA = 150
+
+def vegetation_overlay(vegetation, cells):
+    """The biomass overlay of `cells` (a rect in grid cells) at screen scale, rebuilt only when the grid changed."""
+    cached = _vegetation_overlays.get(vegetation)
+    if cached is None or cached[0] != vegetation.version:
+        grid = pygame.Surface((vegetation.width, vegetation.height), pygame.SRCALPHA)
+        grid.fill(VEGETATION_COLOR)
+        alpha = pygame.surfarray.pixels_alpha(grid)
+        alpha[:] = vegetation.biomass * (VEGETATION_MAX_ALPHA / vegetation.peak)
+        del alpha
+        cached = _vegetation_overlays[vegetation] = [vegetation.version, grid, None, None]
+    if cached[2] != cells:
+        cached[2] = cells
+        cached[3] = pygame.transform.scale(cached[1].subsurface(cells), (cells.width * CELL_SIZE, cells.height * CELL_SIZE))
+    return cached[3]
+
+def draw_vegetation(screen, vegetation, area=None, camera=None):
+    """Draws the vegetation grid's biomass over the visible terrain (only `area` of the screen, if given)."""
+    area = screen.get_rect() if area is None else screen.get_rect().clip(area)
+    cam_x, cam_y = (camera.x, camera.y) if camera else (0, 0)
+    left, top = max(0, cam_x // CELL_SIZE), max(0, cam_y // CELL_SIZE)
+    right = min(vegetation.width, (cam_x + screen.get_width() - 1) // CELL_SIZE + 1)
+    bottom = min(vegetation.height, (cam_y + screen.get_height() - 1) // CELL_SIZE + 1)
+    if left >= right or top >= bottom: return
+    overlay = vegetation_overlay(vegetation, pygame.Rect(left, top, right - left, bottom - top))
+    position = (left * CELL_SIZE - cam_x, top * CELL_SIZE - cam_y)
+    screen.blit(overlay, area, area.move(-position[0], -position[1]))
+
+def night_alpha(world_time):
+    """Darkness of the night overlay at a time of day, quantized to NIGHT_OVERLAY_ALPHA_STEP."""
     time_of_day_norm = world_time / DAY_LENGTH
     alpha = 0
     if 0.25 < time_of_day_norm < 0.75:
@@ -93,27 +198,78 @@ def draw_time_overlay(screen, world_time):
         dist_from_mid = abs(time_of_day_norm - mid_point)
         alpha_norm = 1 - (dist_from_mid / 0.25)
         alpha = int(math.sin(alpha_norm * math.pi) * 120)
+    return alpha - alpha % NIGHT_OVERLAY_ALPHA_STEP
+
+def draw_time_overlay(screen, world_time, area=None):
+    """Draws a transparent overlay to simulate day and night."""
+    alpha = night_alpha(world_time)
     if alpha > 0:
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 20, alpha))
-        screen.blit(overlay, (0, 0))
+        overlay = _night_overlays.get(alpha)
+        if overlay is None:
+            # Surface-wide alpha instead of per-pixel alpha: same blend, a quarter less memory
+            overlay = _night_overlays[alpha] = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            overlay.fill((0, 0, 20))
+            overlay.set_alpha(alpha)
+        if area is None: screen.blit(overlay, (0, 0))
+        else: screen.blit(overlay, area, area)
+
 
-def draw_main_ui(screen, time_info, creature_counts, simulation_speed):
-    """Draws the main UI panel at the top of the screen."""
+class DirtyRects:
+    """
+    Dirty-rectangle presentation for the optional DIRTY_RECT_RENDERING mode.
+    Instead of redrawing the background and flipping the whole screen, only the
+    regions drawn last frame are restored from the baked terrain and night overlay,
+    and only the regions drawn last frame and this frame are sent to the display.
+    A full redraw still happens on the first frame and whenever the night overlay
+    changes level or the vegetation grid (if any) grows.
+    """
+
+    def __init__(self):
+        self.previous = []
+        self.alpha = None
+        self.vegetation_version = None
+
+    def draw_background(self, screen, world_data, terrain_assets, world_time, camera=None, vegetation=None):
+        alpha = night_alpha(world_time)
+        version = vegetation.version if vegetation is not None else None
+        if alpha != self.alpha or version != self.vegetation_version:
+            self.alpha, self.vegetation_version, self.previous = alpha, version, None
+            draw_world(screen, world_data, terrain_assets, camera=camera)
+            if vegetation is not None: draw_vegetation(screen, vegetation, camera=camera)
+            draw_time_overlay(screen, world_time)
+            return
+        for rect in self.previous:
+            draw_world(screen, world_data, terrain_assets, rect, camera)
+            if vegetation is not None: draw_vegetation(screen, vegetation, rect, camera)
+            draw_time_overlay(screen, world_time, rect)
+
+    def present(self, rects):
+        """Updates the display with this frame's drawn `rects` (a full flip after a full redraw)."""
+        if self.previous is None: pygame.display.flip()
+        else: pygame.display.update(self.previous + rects)
+        self.previous = [rect.clip(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT) for rect in rects]
+
+    def invalidate(self):
+        """Forces a full redraw on the next frame (e.g. after loading another world or moving the camera)."""
+        self.alpha = None
+
+def draw_main_ui(screen, time_info, creature_counts, speed_label):
+    """Draws the main UI panel at the top of the screen and returns its rect."""
     ui_panel = pygame.Surface((SCREEN_WIDTH, 40), pygame.SRCALPHA)
     ui_panel.fill((20, 20, 40, 180))
-    screen.blit(ui_panel, (0, 0))
+    panel_rect = screen.blit(ui_panel, (0, 0))
     total_days = time_info['season_timer'] // DAY_LENGTH
     hour = int((time_info['world_time'] / DAY_LENGTH) * 24)
     time_text = FONT_MEDIUM.render(f"Season: {time_info['current_season']} | Day: {total_days} | {hour:02d}:00", True, (255, 255, 255))
-    speed_text = FONT_MEDIUM.render(f"Speed: {simulation_speed}x", True, (200, 200, 255))
+    speed_text = FONT_MEDIUM.render(f"Speed: {speed_label}", True, (200, 200, 255))
     screen.blit(time_text, (10, 10))
-    screen.blit(speed_text, (SCREEN_WIDTH - 120, 10))
+    screen.blit(speed_text, (SCREEN_WIDTH - speed_text.get_width() - 10, 10))
     x_offset = 450
     for name, count in creature_counts.items():
         text = FONT_MEDIUM.render(f"{name}: {count}", True, (200, 200, 200))
         screen.blit(text, (x_offset, 10))
         x_offset += text.get_width() + 20
+    return panel_rect
 
 def draw_inspector_panel(screen, creature):
     """Draws the inspector panel for a selected creature."""
@@ -127,7 +283,7 @@ def draw_inspector_panel(screen, creature):
     energy_text = FONT_SMALL.render(f"Energy: {int(creature.energy)}", True, (255, 255, 255))
     age_text = FONT_SMALL.render(f"Age: {creature.age // 100}", True, (255, 255, 255))
     panel.blit(energy_text, (15, 45)); panel.blit(age_text, (15, 65))
-    screen.blit(panel, (panel_x, panel_y))
+    return screen.blit(panel, (panel_x, panel_y))
 
 def draw_god_mode_ui(screen, current_tool):
     """Draws the UI for the current God Mode tool."""
@@ -143,34 +299,79 @@ def draw_god_mode_ui(screen, current_tool):
     bg_surface = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
     bg_surface.fill((20, 20, 40, 180))
     screen.blit(bg_surface, bg_rect); screen.blit(text, text_rect)
+    return bg_rect
 
-def draw_statistics_panel(screen, history):
-    """Draws a panel with a line graph of population history."""
-    if not history: return
+def draw_replay_ui(screen, tick, replay):
+    """Draws the replay timeline (position within the recording and seek keys) and returns its rect."""
+    span = max(1, replay.end_tick - replay.start_tick)
+    text = FONT_MEDIUM.render(f"Replay: tick {tick} / {replay.end_tick}   [ ] seek, Home restart", True, (255, 220, 100))
+    text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 36))
+    bg_rect = text_rect.inflate(20, 24).move(0, 6)
+    bg_surface = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
+    bg_surface.fill((20, 20, 40, 180))
+    screen.blit(bg_surface, bg_rect); screen.blit(text, text_rect)
+    bar = pygame.Rect(bg_rect.x + 10, bg_rect.bottom - 8, bg_rect.width - 20, 3)
+    pygame.draw.rect(screen, (80, 80, 110), bar)
+    pygame.draw.rect(screen, (255, 220, 100), (bar.x, bar.y, bar.width * (tick - replay.start_tick) / span, bar.height))
+    return bg_rect
+
+# Rendered statistics panel of each history, with the history version it shows
+_statistics_panels = weakref.WeakKeyDictionary()
+
+def statistics_panel(history):
+    """The population graph panel of a PopulationHistory, re-rendered only when a sample was added."""
+    cached = _statistics_panels.get(history)
+    if cached and cached[0] == history.version: return cached[1]
     panel_width, panel_height = 400, 250
-    panel_x, panel_y = 10, SCREEN_HEIGHT - panel_height - 10
     panel = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
     panel.fill((20, 20, 40, 220))
     title = FONT_MEDIUM.render("Population Over Time", True, (255, 255, 255))
     panel.blit(title, (10, 5))
     graph_rect = pygame.Rect(40, 40, panel_width - 50, panel_height - 50)
     pygame.draw.rect(panel, (10, 10, 20), graph_rect)
-    max_pop = max(max(d.values()) for d in history) if history else 1
+    bin_days, samples = history.series()
+    max_pop = max((max(sample) for sample in samples), default=0)
     if max_pop == 0: max_pop = 1
-    archetype_names = list(history[0].keys()) if history else []
     colors = [(100, 255, 100), (255, 100, 100), (100, 100, 255), (255, 255, 100)]
-    for j, name in enumerate(archetype_names):
+    for j in range(len(history.names)):
         points = []
-        for i, data in enumerate(history):
-            x = graph_rect.x + (i / max(1, len(history) - 1)) * graph_rect.width
-            y = graph_rect.y + graph_rect.height - (data.get(name, 0) / max_pop) * graph_rect.height
+        for i, sample in enumerate(samples):
+            x = graph_rect.x + (i / max(1, len(samples) - 1)) * graph_rect.width
+            y = graph_rect.y + graph_rect.height - (sample[j] / max_pop) * graph_rect.height
             points.append((x, y))
         if len(points) > 1:
             pygame.draw.lines(panel, colors[j % len(colors)], False, points, 2)
     pygame.draw.line(panel, (255, 255, 255), (graph_rect.left, graph_rect.bottom), (graph_rect.right, graph_rect.bottom), 1)
     pygame.draw.line(panel, (255, 255, 255), (graph_rect.left, graph_rect.bottom), (graph_rect.left, graph_rect.top), 1)
-    y_axis_label = FONT_SMALL.render(str(max_pop), True, (255, 255, 255))
+    y_axis_label = FONT_SMALL.render(str(round(max_pop)), True, (255, 255, 255))
     panel.blit(y_axis_label, (graph_rect.left - 30, graph_rect.top - 5))
-    x_axis_label = FONT_SMALL.render(f"{len(history)} days", True, (255, 255, 255))
-    panel.blit(x_axis_label, (graph_rect.right - 40, graph_rect.bottom + 5))
-    screen.blit(panel, (panel_x, panel_y))
+    span = history.capacity * bin_days
+    x_label = f"{len(history)} days" if span >= len(history) else f"last {span} of {len(history)} days"
+    x_axis_label = FONT_SMALL.render(x_label, True, (255, 255, 255))
+    panel.blit(x_axis_label, (graph_rect.right - x_axis_label.get_width(), graph_rect.bottom + 5))
+    _statistics_panels[history] = (history.version, panel)
+    return panel
+
+def draw_statistics_panel(screen, history):
+    """Draws a panel with a line graph of population history."""
+    if not len(history): return
+    panel = statistics_panel(history)
+    return screen.blit(panel, (10, SCREEN_HEIGHT - panel.get_height() - 10))
+
+def draw_profiler_panel(screen, summary):
+    """Draws the per-phase timings (mean and max ms per frame) next to the statistics panel."""
+    if not summary: return
+    row_height = 18
+    panel_width, panel_height = 330, 40 + row_height * len(summary)
+    panel_x, panel_y = 420, SCREEN_HEIGHT - panel_height - 10
+    panel = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
+    panel.fill((20, 20, 40, 220))
+    panel.blit(FONT_MEDIUM.render("Frame Time (ms)", True, (255, 255, 255)), (10, 5))
+    panel.blit(FONT_SMALL.render("mean    max", True, (180, 180, 180)), (panel_width - 105, 12))
+    for i, (name, (mean, peak)) in enumerate(summary.items()):
+        y = 35 + i * row_height
+        depth = name.count('.')
+        color = (255, 255, 255) if depth == 0 else (200, 200, 220) if depth == 1 else (160, 160, 190)
+        panel.blit(FONT_SMALL.render(name.rsplit('.', 1)[-1], True, color), (10 + depth * 14, y))
+        panel.blit(FONT_SMALL.render(f"{mean:6.2f}  {peak:6.2f}", True, color), (panel_width - 115, y))
+    return screen.blit(panel, (panel_x, panel_y))
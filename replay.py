@@ -0,0 +1,40 @@
+"""
+Inspects a recorded run without a window: seeks to a tick (restoring the nearest
+keyframe and fast-forwarding) and prints the population there and the events
+that led up to it. Use `python main.py --replay DIR` to watch it instead.
+
+    python replay.py replays/run_20240101_120000 --seek 25000 --events 500
+"""
+import os
+import sys
+import argparse
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import neat
+
+from core.simulation import Simulation
+from core.replay import Replay
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seek into a recorded ecosystem run")
+    parser.add_argument("recording", help="recording directory (see REPLAY_DIR)")
+    parser.add_argument("--seek", type=int, default=None, help="tick to seek to (defaults to the end)")
+    parser.add_argument("--events", type=int, default=100, help="print the events of the last N ticks before it")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), 'config-feedforward.txt'))
+    args = parser.parse_args()
+
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation, args.config)
+    sim = Simulation(config)
+    replay = Replay(sim, args.recording)
+    replay.seek(replay.end_tick if args.seek is None else args.seek)
+
+    print(f"--- Tick {sim.tick} of {replay.start_tick}-{replay.end_tick} | generation {sim.neat_population.generation} ---")
+    print(f"Population: {sim.creature_counts()} | food: {sim.food_amount()}")
+    for event in replay.events_between(sim.tick - args.events + 1, sim.tick):
+        details = ", ".join(f"{k}={v}" for k, v in event.items() if k not in ('tick', 'type'))
+        print(f"[tick {event['tick']}] {event['type']}: {details}")
+    sys.exit(0)
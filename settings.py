@@ -1,11 +1,21 @@
-import pygame
+import os
+
+# Pasta do projeto: os ficheiros que a simulação escreve (terrenos, gravações, checkpoints)
+# ficam dentro dela, seja qual for a pasta de onde é executada
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # --- Configurações da Janela e Grade ---
 SCREEN_WIDTH, SCREEN_HEIGHT, CELL_SIZE = 1280, 720, 16
 GRID_WIDTH, GRID_HEIGHT = SCREEN_WIDTH // CELL_SIZE, SCREEN_HEIGHT // CELL_SIZE
+# Tamanho do mundo em células (pode ser maior do que o ecrã)
+WORLD_WIDTH, WORLD_HEIGHT = GRID_WIDTH, GRID_HEIGHT
 
 # --- Parâmetros do Mundo e Terrenos ---
 SCALE, OCTAVES, PERSISTENCE, LACUNARITY = 80.0, 6, 0.5, 2.0
+# Pasta onde os terrenos gerados ficam guardados (por semente e parâmetros do ruído) e número
+# máximo de terrenos guardados (os usados há mais tempo são apagados)
+TERRAIN_CACHE_DIR = os.path.join(PROJECT_DIR, ".terrain_cache")
+TERRAIN_CACHE_MAX_FILES = 32
 TERRAINS = {
     "DEEP_WATER": {"color": (4, 43, 99), "movement_cost": 10.0, "energy_cost": 2.0},
     "SHALLOW_WATER": {"color": (36, 114, 184), "movement_cost": 4.0, "energy_cost": 1.5},
@@ -15,16 +25,26 @@ TERRAINS = {
     "MOUNTAIN": {"color": (130, 130, 130), "movement_cost": 5.0, "energy_cost": 1.2},
     "SNOW": {"color": (255, 255, 255), "movement_cost": 6.0, "energy_cost": 1.5}
 }
+# Terrenos onde a comida pode nascer e onde as criaturas podem fazer ninho
+FOOD_SPAWN_TERRAINS = ("GRASSLAND", "FOREST", "BEACH")
+CREATURE_SPAWN_TERRAINS = ("BEACH", "GRASSLAND", "FOREST", "SNOW")
+# Vegetação em grelha: em vez de plantas soltas, cada célula guarda uma biomassa (medida em
+# plantas) que volta a crescer conforme o terreno e a estação, e as criaturas comem da célula
+# onde estão. False mantém a comida como plantas individuais
+VEGETATION_GRID = False
+# Biomassa máxima por célula e crescimento por tick na primavera, por terreno (os outros não têm plantas)
+VEGETATION_CAPACITY = {"BEACH": 0.3, "GRASSLAND": 1.0, "FOREST": 1.5}
+VEGETATION_GROWTH = {"BEACH": 0.00005, "GRASSLAND": 0.0002, "FOREST": 0.00015}
+# Multiplicador do crescimento em cada estação
+VEGETATION_SEASON_GROWTH = {"Primavera": 1.0, "Verão": 1.6, "Outono": 0.5, "Inverno": 0.15}
+# Biomassa comida de cada dentada (uma planta inteira dá energy_per_food) e ticks entre dois passos de crescimento
+VEGETATION_BITE = 0.5
+VEGETATION_GROW_EVERY = 10
 
 # --- Parâmetros de Tempo e Estação ---
 DAY_LENGTH = 2400
 SEASON_LENGTH = 4 * DAY_LENGTH
 
-# --- Fontes ---
-pygame.font.init()
-FONT_SMALL = pygame.font.Font(None, 24)
-FONT_MEDIUM = pygame.font.Font(None, 32)
-
 # --- Configurações das Tribos ---
 NUMBER_OF_TRIBES_PER_SPECIES = 3
 TRIBE_COLORS = [
@@ -33,4 +53,77 @@ TRIBE_COLORS = [
     (255, 255, 0),  # Amarelo
     (0, 255, 255),  # Ciano
     (255, 0, 255),  # Magenta
-]
\ No newline at end of file
+]
+
+# --- Câmara e Nível de Detalhe ---
+# Velocidade da câmara (teclas WASD), em píxeis por segundo
+CAMERA_PAN_SPEED = 900
+# Lado (em células) dos pedaços do mundo: o terreno é desenhado pedaço a pedaço, só quando fica
+# visível, e guardam-se no máximo TERRAIN_CHUNK_CACHE_SIZE pedaços desenhados
+CHUNK_CELLS = 16
+TERRAIN_CHUNK_CACHE_SIZE = 128
+# Nível de detalhe: as criaturas a mais de LOD_FULL_RADIUS pedaços do centro da câmara só
+# pensam a cada LOD_THINK_EVERY ticks (nos outros seguem a última decisão)
+LOD_FULL_RADIUS = 3
+LOD_THINK_EVERY = 4
+
+# --- Desempenho da Simulação ---
+# Lado (em células) de cada balde do índice espacial usado nas buscas de vizinhos
+SPATIAL_BUCKET_CELLS = 4
+# Número máximo de redes neurais construídas mantidas em cache (LRU)
+NETWORK_CACHE_SIZE = 256
+# Perceção escalonada: cada criatura refaz as buscas de vizinhos e a escolha de alvos a cada
+# PERCEPTION_REFRESH_EVERY ticks (ou antes, se um alvo desaparecer ou surgir um predador);
+# nos outros ticks reaproveita os alvos que já tinha. 1 desativa
+PERCEPTION_REFRESH_EVERY = 1
+
+# --- Ritmo da Simulação ---
+# Ticks por segundo à velocidade 1x e velocidades disponíveis (None = máxima)
+BASE_TICK_RATE = 60
+SIMULATION_SPEEDS = [1, 2, 5, 10, 25, 50, 100, None]
+# Imagens por segundo; a partir de FAST_FORWARD_SPEED desenha-se menos para sobrar tempo à simulação
+RENDER_FPS = 60
+FAST_FORWARD_SPEED = 25
+FAST_FORWARD_RENDER_FPS = 10
+# Fração de cada imagem que pode ser gasta a correr ticks
+SIMULATION_TIME_BUDGET = 0.8
+
+# --- Gravações e Replay ---
+# Checkpoint a cada N ticks (0 desliga), pasta dos checkpoints e
+# número de checkpoints parciais (só o que mudou) entre dois completos
+CHECKPOINT_EVERY = 0
+CHECKPOINT_DIR = os.path.join(PROJECT_DIR, "checkpoints")
+SNAPSHOT_FULL_EVERY = 10
+# Gravação para replay (desligada por omissão: cada sessão grava keyframes e eventos em disco),
+# pasta das gravações, número máximo de gravações guardadas (as mais antigas
+# são apagadas), ticks entre keyframes e salto (em ticks) ao navegar
+REPLAY_RECORDING = False
+REPLAY_DIR = os.path.join(PROJECT_DIR, "replays")
+REPLAY_MAX_RECORDINGS = 5
+REPLAY_KEYFRAME_EVERY = 2000
+REPLAY_SEEK_STEP = 1000
+
+# --- Evolução e Estatísticas ---
+# Evolução NEAT num processo à parte na janela (a simulação continua enquanto a nova geração é calculada)
+BACKGROUND_EVOLUTION = True
+# Histórico da população (uma amostra por dia): amostras por nível e número de níveis,
+# cada um com metade da resolução do anterior, para a memória não crescer em corridas longas
+POPULATION_HISTORY_CAPACITY = 256
+POPULATION_HISTORY_LEVELS = 12
+
+# --- Desenho ---
+# Redesenha só as zonas à volta das criaturas e da comida (em vez do ecrã inteiro)
+DIRTY_RECT_RENDERING = False
+# Passo de transparência da sobreposição noturna (cada nível é desenhado uma vez e reutilizado)
+NIGHT_OVERLAY_ALPHA_STEP = 8
+# Cache de sprites das criaturas: número máximo de sprites, direções por volta completa,
+# e passos de arredondamento do tamanho do corpo e da cor do padrão
+SPRITE_CACHE_SIZE = 2048
+SPRITE_ANGLE_STEPS = 64
+SPRITE_SIZE_STEP = 0.05
+SPRITE_COLOR_STEP = 8
+
+# --- Medição de Desempenho ---
+# Medição do tempo de cada fase (ligável com F3) e número de amostras na média móvel
+PROFILING = False
+PROFILER_WINDOW = 120